@@ -0,0 +1,28 @@
+import random
+from typing import Optional
+
+
+class Backoff:
+    """Exponential backoff with jitter.
+
+    The delay before the attempt `n` grows as `base * factor ** (n - 1)` up to `cap` seconds and a random part
+    of it (up to `jitter`) is cut off, so many clients don't retry at the same moment. The `retry_after` value
+    of a Telegram response always wins, since the server doesn't accept requests earlier.
+    """
+
+    def __init__(self, base: float = 1.0, factor: float = 2.0, cap: float = 30.0, jitter: float = 0.5):
+        if not 0 <= jitter <= 1:
+            raise ValueError("The `jitter` must be between 0 and 1")
+        self.base = base
+        self.factor = factor
+        self.cap = cap
+        self.jitter = jitter
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        if retry_after is not None:
+            return float(retry_after)
+        delay = min(self.cap, self.base * self.factor ** max(attempt - 1, 0))
+        return delay * (1 - self.jitter * random.random())
+
+    def __repr__(self) -> str:
+        return "Backoff(base={}, factor={}, cap={}, jitter={})".format(self.base, self.factor, self.cap, self.jitter)
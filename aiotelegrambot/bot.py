@@ -1,15 +1,21 @@
 import asyncio
 import logging
-from typing import Callable, Union
+import time
+from typing import Callable, List, Optional, Union
 
 import aiohttp
 import aiojobs
 
 from aiotelegrambot.client import Client
+from aiotelegrambot.dedup import SeenUpdates
 from aiotelegrambot.errors import BotError, TelegramApiError
-from aiotelegrambot.handler import Handlers
+from aiotelegrambot.executor import Executor, OrderedExecutor, WorkerPool
+from aiotelegrambot.filters import Filters
+from aiotelegrambot.handler import Handler, Handlers
 from aiotelegrambot.message import Message
 from aiotelegrambot.middleware import Middlewares
+from aiotelegrambot.offset import OffsetStore, OffsetTracker
+from aiotelegrambot.stats import PollingStats
 from aiotelegrambot.types import recognize_type
 
 logger = logging.getLogger(__name__)
@@ -20,22 +26,102 @@ class Bot:
         self.client = client
         self.handlers = handlers or Handlers()
         self.middlewares = Middlewares()
+        self.filters = Filters()
         self._scheduler = None
+        self._executor = None
+        self._poller = None
+        self._dispatcher = None
+        self._updates = None
+        self._in_flight = 0
+        self._max_in_flight = None
+        self._capacity = None
+        self._offsets = None
+        self._seen = None
         self._closed = True
         self._update_id = 0
         self.ctx = {}
+        self.polling_stats = PollingStats()
 
-    async def initialize(self, *, webhook: bool = False, interval: float = 0.1, **scheduler_options):
+    async def initialize(
+        self,
+        *,
+        webhook: bool = False,
+        interval: float = 0.1,
+        poll_timeout: int = 0,
+        poll_limit: Optional[int] = None,
+        prefetch: int = 0,
+        ordered: bool = False,
+        workers: int = 0,
+        queue_size: int = 1000,
+        max_in_flight: Optional[int] = None,
+        offset_store: Optional[OffsetStore] = None,
+        commit_batch: int = 100,
+        dedup_window: int = 0,
+        **scheduler_options
+    ):
+        """Initialize the bot.
+
+        With `poll_timeout` greater than zero the bot uses long polling: Telegram holds the `getUpdates` request
+        until an update arrives or the timeout expires. `poll_limit` limits the number of updates in one batch.
+
+        With `prefetch` greater than zero fetched updates are handed over to a background dispatcher through
+        a buffer of this size, so the next `getUpdates` request is sent while the current batch is being routed.
+        In webhook mode the buffer is always used (1000 updates by default) to take updates from `feed_update`.
+
+        With `ordered` the updates of the same chat are handled one by one in the order they came,
+        the updates of different chats are still handled concurrently.
+
+        With `workers` greater than zero the updates are handled by this number of long-lived workers
+        pulling them from a queue of `queue_size` instead of spawning a scheduler job per update.
+
+        With `max_in_flight` the poller stops fetching updates while this number of updates is being handled,
+        so the backlog is held by Telegram instead of the memory of the process.
+
+        With `offset_store` the poller confirms only handled updates and saves the offset of the first update
+        which isn't handled yet every `commit_batch` handled updates, so after restart the bot continues from it.
+
+        With `dedup_window` greater than zero the bot remembers this number of the last update ids and drops
+        the updates which came again, e.g. redelivered webhook updates.
+        """
         if self._closed is False:
             return
 
         if not self.handlers:
             raise BotError("Can't initialize with no one handler")
+        self.handlers.compile()
+        self.middlewares.compile()
+
+        scheduler = await aiojobs.create_scheduler(**scheduler_options)
+        try:
+            if workers > 0:
+                # the poller and the dispatcher of the buffered updates live as long as the workers
+                reserved = int(webhook is False) + int(webhook is True or prefetch > 0)
+                executor = WorkerPool(scheduler, self._handle, workers, queue_size, ordered, reserved)
+            elif ordered:
+                executor = OrderedExecutor(scheduler, self._handle)
+            else:
+                executor = Executor(scheduler, self._handle)
+        except BotError:
+            await scheduler.close()
+            raise
 
         self._closed = False
-        self._scheduler = await aiojobs.create_scheduler(**scheduler_options)
+        self._scheduler = scheduler
+        self._executor = executor
+        self._max_in_flight = max_in_flight
+        self._capacity = asyncio.Event()
+        self._capacity.set()
+        if dedup_window > 0:
+            self._seen = SeenUpdates(dedup_window)
+        if offset_store is not None:
+            self._offsets = OffsetTracker(offset_store, commit_batch)
+            self._update_id = self._offsets.offset
+        await self._executor.start()
+        if webhook is True or prefetch > 0:
+            self._updates = asyncio.Queue(maxsize=prefetch or 1000)
+            self._dispatcher = await self._scheduler.spawn(self._dispatch_updates())
         if webhook is False:
-            await self._scheduler.spawn(self._get_updates(interval))
+            self._poller = await self._scheduler.spawn(self._get_updates(interval, poll_timeout, poll_limit))
 
     async def close(self):
         if self._closed:
@@ -43,48 +129,202 @@ class Bot:
 
         self._closed = True
 
+        if self._poller is not None:
+            # don't wait for a pending long polling request
+            await self._poller.close()
+            self._poller = None
+
+        if self._dispatcher is not None:
+            # dispatch everything that was already fetched
+            await self._updates.put(None)
+            await self._dispatcher.wait()
+            self._dispatcher = None
+            self._updates = None
+
+        await self._executor.close()
+        self._executor = None
+
         for job in self._scheduler:
             await job.wait()
 
         await self._scheduler.close()
         self._scheduler = None
 
+        if self._offsets is not None:
+            # the store belongs to the caller, it may be used again
+            self._offsets.commit()
+            self._offsets = None
+        self._seen = None
+
         self._update_id = 0
+        self._in_flight = 0
+
+    @property
+    def in_flight(self) -> int:
+        """The number of updates being handled"""
+        return self._in_flight
+
+    @property
+    def queue_depth(self) -> int:
+        """The number of fetched updates which are not handled yet"""
+        return self._in_flight + (self._updates.qsize() if self._updates is not None else 0)
 
     def add_handler(self, handler: Callable, *args, **kwargs):
         self.handlers.add(*args, **kwargs)(handler)
 
+    def set_handlers(self, handlers: Handlers):
+        """Replace the handlers, also of the running bot.
+
+        The new handlers are compiled before the swap, so the updates are routed either by the old table or by
+        the new one. Updates which are already routed finish with the old handlers.
+        To change the current handlers, build the new ones from a copy: `bot.handlers.copy()`.
+        """
+        if not handlers:
+            raise BotError("Can't set no one handler")
+        handlers.compile()
+        self.handlers = handlers
+        self.middlewares.compile()
+
     async def process_update(self, data: dict):
         if self._closed is True:
             raise RuntimeError("The bot isn't initialized")
 
-        chat_type, incoming, content_type = recognize_type(data)
-        handler = self.handlers.get(chat_type, incoming, content_type, data)
-        await self._scheduler.spawn(
-            self.middlewares(Message(self.client, data, self.ctx, chat_type, incoming, content_type), handler)
-        )
+        await self._process_update(data)
+
+    def feed_update(self, data: dict, webhook_reply: Optional[asyncio.Future] = None) -> bool:
+        """Put the update into the buffer to be dispatched in background.
+
+        Returns `False` if the bot isn't initialized or the buffer is full, so the update should be delivered later.
+        The first `send_message` call of the handler is passed to `webhook_reply` unless it is already done.
+        """
+        if self._closed is True or self._updates is None:
+            return False
+        try:
+            self._updates.put_nowait((data, webhook_reply))
+        except asyncio.QueueFull:
+            return False
+        return True
 
-    async def _get_updates(self, interval: float):
+    async def _process_update(self, data: dict, webhook_reply: Optional[asyncio.Future] = None):
+        try:
+            if self._seen is not None and not self._seen.add(data["update_id"]):
+                logger.debug("Skip duplicate update %s", data["update_id"])
+                self._skip(data, webhook_reply)
+                return
+            if self.filters and not self.filters(data):
+                logger.debug("Filter out update %s", data.get("update_id"))
+                self._skip(data, webhook_reply)
+                return
+
+            chat_type, incoming, content_type = recognize_type(data)
+            handler, match, text = self.handlers.resolve(chat_type, incoming, content_type, data)
+        except BaseException:
+            # the update is never handled, so it mustn't hold the offset back
+            self._skip(data, webhook_reply)
+            raise
+
+        self._in_flight += 1
+        if self._max_in_flight is not None and self._in_flight >= self._max_in_flight:
+            self._capacity.clear()
+        try:
+            await self._executor.submit(
+                Message(self.client, data, self.ctx, chat_type, incoming, content_type, webhook_reply, match, text),
+                handler
+            )
+        except BaseException:
+            self._release(data.get("update_id"))
+            raise
+
+    def _skip(self, data: dict, webhook_reply: Optional[asyncio.Future]):
+        if self._offsets is not None:
+            self._offsets.done(data.get("update_id"))
+        if webhook_reply is not None and not webhook_reply.done():
+            webhook_reply.set_result(None)
+
+    async def _handle(self, message: Message, handler: Handler):
+        try:
+            await self.middlewares(message, handler)
+        finally:
+            message.release_webhook_reply()
+            self._release(message.raw.get("update_id"))
+
+    def _release(self, update_id: Optional[int]):
+        self._in_flight -= 1
+        if self._max_in_flight is not None and self._in_flight < self._max_in_flight:
+            self._capacity.set()
+        if self._offsets is not None:
+            self._offsets.done(update_id)
+
+    async def _wait_capacity(self):
+        if self._max_in_flight is not None and not self._capacity.is_set():
+            started = time.monotonic()
+            await self._capacity.wait()
+            self.polling_stats.throttle(time.monotonic() - started)
+
+    async def _get_updates(self, interval: float, timeout: int = 0, limit: Optional[int] = None):
+        attempt = 0
         while self._closed is False:
             try:
-                data = await self.client.get_updates(self._update_id)
+                await self._wait_capacity()
+                started = time.monotonic()
+                data = await self.client.get_updates(self._update_id, limit, timeout)
+                attempt = 0
+                count = len(data["result"]) if data else 0
+                self.polling_stats.poll(time.monotonic() - started, count)
                 await self._process_updates(data)
-                await asyncio.sleep(interval)
+                # Poll again right away while updates keep coming or the server has already waited for them
+                if count == 0 and not timeout:
+                    await asyncio.sleep(interval)
+                    self.polling_stats.idle(interval)
+                continue
             except TelegramApiError as e:
                 self.client.process_error(str(e), e.response, e.data, False)
-                if e.response.status >= 500:
-                    await asyncio.sleep(30)
-                else:
-                    await asyncio.sleep(10)
-            except asyncio.TimeoutError as e:
-                logger.exception(str(e))
-            except aiohttp.ClientError as e:
+                retry_after = e.retry_after
+            except (asyncio.TimeoutError, aiohttp.ClientError) as e:
                 logger.exception(str(e))
-                await asyncio.sleep(10)
+                retry_after = None
+
+            # the backoff policy of the client is shared with the poller
+            attempt += 1
+            await asyncio.sleep(self.client.backoff.delay(attempt, retry_after))
 
     async def _process_updates(self, data: Union[None, dict]):
         if data:
+            if self._offsets is not None:
+                await self._process_tracked_updates(data["result"])
+                return
+
             for raw in data["result"]:
-                await self.process_update(raw)
+                if self._updates is None:
+                    await self.process_update(raw)
+                else:
+                    await self._updates.put((raw, None))
                 self._update_id = max(raw["update_id"], self._update_id)
             self._update_id += 1 if data["result"] else 0
+
+    async def _process_tracked_updates(self, result: List[dict]):
+        # Updates are confirmed only when they are handled, so the updates being handled come again
+        requested = self._update_id
+        new = [raw for raw in result if self._offsets.add(raw["update_id"])]
+        for raw in new:
+            if self._updates is None:
+                await self.process_update(raw)
+            else:
+                await self._updates.put((raw, None))
+        self._update_id = self._offsets.offset
+        # only updates being handled came, poll again once one of them is handled,
+        # unless it has been handled while the request was being sent
+        if result and not new and self._offsets.pending and self._offsets.offset == requested:
+            await self._offsets.wait()
+            self._update_id = self._offsets.offset
+
+    async def _dispatch_updates(self):
+        while True:
+            item = await self._updates.get()
+            if item is None:
+                break
+            try:
+                await self._wait_capacity()
+                await self._process_update(*item)
+            except Exception:
+                logger.exception("Failed to process update")
@@ -5,26 +5,84 @@ from typing import Callable, List, Optional, Union
 
 import aiohttp
 
+from aiotelegrambot.backoff import Backoff
 from aiotelegrambot.errors import TelegramApiError
+from aiotelegrambot.pool import Pool
+from aiotelegrambot.stats import PoolStats
 
 logger = logging.getLogger(__name__)
 
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
 
 class Client:
+    """Client of Telegram API.
+
+    The session is created on the first request, so the client may be built outside of a running event loop.
+    Its connections are configured by `pool`, unless a `connector` is passed. A `session` may be shared between
+    several clients, then it is never closed by them.
+    """
+
     base_url = "https://api.telegram.org/bot"
 
-    def __init__(self, token: str, json_loads: Callable = loads, raise_exceptions: bool = False, **kwargs):
+    def __init__(
+        self,
+        token: str,
+        json_loads: Callable = loads,
+        json_dumps: Callable = dumps,
+        raise_exceptions: bool = False,
+        retries: int = 0,
+        backoff: Optional[Backoff] = None,
+        pool: Optional[Pool] = None,
+        session: Optional[aiohttp.ClientSession] = None,
+        **kwargs
+    ):
         self._url = "{}{}/".format(self.base_url, token)
         self.raise_exceptions = raise_exceptions
+        self.retries = retries
+        self.backoff = backoff or Backoff()
+        # `json_loads` gets the bytes of a response, `json_dumps` may return either str or bytes
         self._json_loads = json_loads
-
-        kwargs["timeout"] = aiohttp.ClientTimeout(total=kwargs.get("timeout", 10))
-
-        self._json_loads = json_loads
-        self._session = aiohttp.ClientSession(**kwargs)
+        self._json_dumps = json_dumps
+        self.pool = pool or Pool()
+        self._timeout = kwargs.get("timeout", 10)
+        self._client_timeout = aiohttp.ClientTimeout(total=self._timeout)
+
+        kwargs["timeout"] = self._client_timeout
+
+        self._session = session
+        self._own_session = session is None
+        self._session_kwargs = kwargs
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None:
+            kwargs = self._session_kwargs
+            if "connector" not in kwargs:
+                kwargs = dict(kwargs, connector=self.pool.connector())
+            self._session = aiohttp.ClientSession(**kwargs)
+        return self._session
+
+    @property
+    def pool_stats(self) -> PoolStats:
+        return PoolStats(self._session.connector if self._session is not None else None)
+
+    @property
+    def json_loads(self) -> Callable:
+        return self._json_loads
+
+    @property
+    def json_dumps(self) -> Callable:
+        return self._json_dumps
+
+    def dump_json(self, data) -> bytes:
+        body = self._json_dumps(data)
+        return body.encode() if isinstance(body, str) else body
 
     async def close(self):
-        await self._session.close()
+        if self._own_session and self._session is not None:
+            await self._session.close()
+            self._session = None
 
     async def get_updates(
         self,
@@ -33,13 +91,16 @@ class Client:
         timeout: Optional[Union[int, str]] = None,
     ) -> Optional[dict]:
         params = {}
+        kwargs = {}
         if offset:
             params["offset"] = offset
         if limit:
             params["limit"] = limit
         if timeout:
             params["timeout"] = timeout
-        return await self.request("get", "getUpdates", raise_exception=True, params=params)
+            # the server holds a long polling request up to `timeout` seconds, so the client must wait longer
+            kwargs["timeout"] = aiohttp.ClientTimeout(total=self._timeout + int(timeout))
+        return await self.call("getUpdates", params, raise_exception=True, **kwargs)
 
     async def set_webhook(
         self,
@@ -47,6 +108,7 @@ class Client:
         certificate: Optional[str] = None,
         max_connections: Optional[int] = None,
         allowed_updates: Optional[List[str]] = None,
+        secret_token: Optional[str] = None,
     ) -> Optional[dict]:
         kwargs = {"params": [("url", url)]}
         if certificate:
@@ -55,42 +117,84 @@ class Client:
             kwargs["params"].append(("max_connections", max_connections))
         if allowed_updates is not None:
             kwargs["params"].append(("allowed_updates", dumps(allowed_updates)))
+        if secret_token is not None:
+            kwargs["params"].append(("secret_token", secret_token))
         return await self.request("post", "setWebhook", **kwargs)
 
     async def get_webhook_info(self) -> Optional[dict]:
-        return await self.request("get", "getWebhookInfo")
+        return await self.call("getWebhookInfo")
 
     async def delete_webhook(self) -> Optional[dict]:
-        return await self.request("get", "deleteWebhook")
+        return await self.call("deleteWebhook")
 
     async def send_message(self, text: str, chat_id: Union[int, str], reply_to_message_id: Optional[int] = None):
         params = {"chat_id": chat_id, "text": text}
         if reply_to_message_id:
             params["reply_to_message_id"] = reply_to_message_id
-        await self.request("get", "sendMessage", params=params)
+        await self.call("sendMessage", params)
+
+    async def call(
+        self, api: str, params: Optional[dict] = None, raise_exception: bool = None, **kwargs
+    ) -> Optional[dict]:
+        """Call the method of Telegram API with the parameters in a JSON body"""
+        if params:
+            kwargs["data"] = self.dump_json(params)
+            kwargs["headers"] = _JSON_HEADERS
+        return await self.request("post", api, raise_exception, **kwargs)
 
     async def request(self, method: str, api: str, raise_exception: bool = None, **kwargs) -> Optional[dict]:
+        """Make a request to Telegram API.
+
+        Server errors, flood limits, timeouts and connection errors are retried up to `retries` times
+        with delays given by `backoff`.
+        """
         raise_exception = raise_exception if raise_exception is not None else self.raise_exceptions
 
-        try:
-            return await self._request(method, api, raise_exception, **kwargs)
-        except asyncio.TimeoutError:
-            if raise_exception:
-                raise
-            logger.exception("Timeout")
-        except aiohttp.ClientError:
-            if raise_exception:
-                raise
-            logger.exception("Telegram API connection error")
+        attempt = 0
+        while True:
+            retry = attempt < self.retries
+            try:
+                return await self._request(method, api, raise_exception or retry, **kwargs)
+            except TelegramApiError as e:
+                if retry and e.is_retryable:
+                    delay = self.backoff.delay(attempt + 1, e.retry_after)
+                elif raise_exception:
+                    raise
+                else:
+                    self.process_error(str(e), e.response, e.data, False)
+                    return None
+            except asyncio.TimeoutError:
+                if retry:
+                    delay = self.backoff.delay(attempt + 1)
+                elif raise_exception:
+                    raise
+                else:
+                    logger.exception("Timeout")
+                    return None
+            except aiohttp.ClientError:
+                if retry:
+                    delay = self.backoff.delay(attempt + 1)
+                elif raise_exception:
+                    raise
+                else:
+                    logger.exception("Telegram API connection error")
+                    return None
+
+            attempt += 1
+            logger.warning("Retry %s request in %.1f seconds", api, delay)
+            await asyncio.sleep(delay)
 
     async def _request(self, method: str, api: str, raise_exception, **kwargs) -> Optional[dict]:
         url = self._url + api
+        if not self._own_session:
+            # a shared session has its own timeout
+            kwargs.setdefault("timeout", self._client_timeout)
 
-        async with getattr(self._session, method)(url, **kwargs) as response:
+        async with getattr(self.session, method)(url, **kwargs) as response:
             if response.status >= 500:
                 self.process_error("Server error", response, None, raise_exception)
             else:
-                data = self._json_loads(await response.text())
+                data = self._json_loads(await response.read())
                 if response.status == 200:
                     if data["ok"]:
                         return data
@@ -0,0 +1,40 @@
+class SeenUpdates:
+    """A sliding window of recently seen update ids.
+
+    Bit `i` of the bitmap is set when the update `highest - i` was seen. The window takes a fixed amount of memory
+    and an update is checked with a couple of integer operations. Updates older than the window by up to one more
+    window are reported as seen, since there is no way to tell. An even older update is taken as the start
+    of a new sequence, because Telegram starts the ids over from a random one after a week without updates,
+    and the window is moved to it as on a jump forward.
+    """
+
+    def __init__(self, size: int = 1024):
+        if size < 1:
+            raise ValueError("The `size` must be greater than zero")
+        self._size = size
+        self._mask = (1 << size) - 1
+        self._highest = None
+        self._bitmap = 0
+
+    def add(self, update_id: int) -> bool:
+        """Remember the update. Returns `False` if it was already seen."""
+        # the first update starts the window as a jump forward does
+        shift = update_id - self._highest if self._highest is not None else self._size
+        if shift >= self._size or shift <= -2 * self._size:
+            self._highest = update_id
+            self._bitmap = 1
+            return True
+
+        if shift > 0:
+            self._highest = update_id
+            self._bitmap = ((self._bitmap << shift) | 1) & self._mask
+            return True
+
+        if -shift >= self._size:
+            return False
+
+        bit = 1 << -shift
+        if self._bitmap & bit:
+            return False
+        self._bitmap |= bit
+        return True
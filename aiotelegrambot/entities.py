@@ -0,0 +1,75 @@
+from typing import Callable, Dict, List, Optional, Union
+
+from aiotelegrambot.types import Content
+
+
+def _get_slicer(text: str) -> Callable[[int, int], str]:
+    """Slice the text by offset and length in UTF-16 code units, the way Telegram counts them"""
+    if text.isascii() or len(text.encode("utf-16-le")) == len(text) * 2:
+        # no characters outside the Basic Multilingual Plane, UTF-16 code units are the string indexes
+        return lambda offset, length: text[offset:offset + length]
+
+    encoded = text.encode("utf-16-le")
+    return lambda offset, length: encoded[offset * 2:(offset + length) * 2].decode("utf-16-le")
+
+
+def entity_text(text: str, entity: dict) -> str:
+    return _get_slicer(text)(entity["offset"], entity["length"])
+
+
+class Entities:
+    """Entities of a message and its caption grouped by type with the text of each one extracted.
+
+    The index is built on first access.
+    """
+
+    _SOURCES = (("text", "entities"), ("caption", "caption_entities"))
+    # the entities of the last message, an update is routed at once, so its rules and handlers share them
+    _last: Optional["Entities"] = None
+
+    def __init__(self, message: dict):
+        self._message = message
+        self._index: Optional[Dict[str, List[str]]] = None
+
+    @classmethod
+    def of(cls, message: dict) -> "Entities":
+        """The entities of the message, shared with the previous call for the same message"""
+        last = cls._last
+        if last is not None and last._message is message:
+            return last
+        entities = cls._last = cls(message)
+        return entities
+
+    @property
+    def index(self) -> Dict[str, List[str]]:
+        if self._index is None:
+            self._index = {}
+            for text_key, entities_key in self._SOURCES:
+                entities = self._message.get(entities_key)
+                if not entities:
+                    continue
+                slicer = _get_slicer(self._message.get(text_key, ""))
+                for entity in entities:
+                    self._index.setdefault(entity["type"], []).append(slicer(entity["offset"], entity["length"]))
+        return self._index
+
+    @staticmethod
+    def _get_type(entity_type: Union[str, Content]) -> str:
+        if isinstance(entity_type, Content):
+            if not entity_type.has_entity:
+                raise ValueError("{} isn't an entity type".format(entity_type))
+            return entity_type.value[2]
+        return entity_type
+
+    def get(self, entity_type: Union[str, Content]) -> List[str]:
+        """Texts of the entities of the type, e.g. `get(Content.HASHTAG)` or `get("text_link")`"""
+        return self.index.get(self._get_type(entity_type), [])
+
+    def __contains__(self, entity_type: Union[str, Content]) -> bool:
+        return self._get_type(entity_type) in self.index
+
+    def __bool__(self) -> bool:
+        return bool(self.index)
+
+    def __repr__(self) -> str:
+        return "Entities({})".format(self.index)
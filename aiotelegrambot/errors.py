@@ -14,6 +14,15 @@ class TelegramApiError(BotError):
         self.response = response
         super().__init__(msg)
 
+    @property
+    def retry_after(self) -> Optional[int]:
+        if self.data:
+            return self.data.get("parameters", {}).get("retry_after")
+
+    @property
+    def is_retryable(self) -> bool:
+        return self.response.status == 429 or self.response.status >= 500
+
 
 class HandlerError(BotError):
     pass
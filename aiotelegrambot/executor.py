@@ -0,0 +1,138 @@
+import asyncio
+import itertools
+import logging
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Hashable, Tuple
+
+from aiojobs import Scheduler
+
+from aiotelegrambot.errors import BotError
+from aiotelegrambot.handler import Handler
+from aiotelegrambot.message import Message
+
+logger = logging.getLogger(__name__)
+
+_RunType = Callable[[Message, Handler], Awaitable]
+
+
+class Executor:
+    """Spawns a scheduler job per update"""
+
+    def __init__(self, scheduler: Scheduler, run: _RunType):
+        self._scheduler = scheduler
+        self._run = run
+
+    async def start(self):
+        pass
+
+    async def submit(self, message: Message, handler: Handler):
+        await self._scheduler.spawn(self._run(message, handler))
+
+    async def close(self):
+        pass
+
+
+class OrderedExecutor(Executor):
+    """Runs updates of the same chat one by one and updates of different chats concurrently"""
+
+    def __init__(self, scheduler: Scheduler, run: _RunType):
+        super().__init__(scheduler, run)
+        self._queues: Dict[Hashable, Deque[Tuple[Message, Handler]]] = {}
+
+    async def submit(self, message: Message, handler: Handler):
+        key = message.chat_id
+        if key is None:
+            await super().submit(message, handler)
+            return
+
+        queue = self._queues.get(key)
+        if queue is not None:
+            queue.append((message, handler))
+        else:
+            self._queues[key] = deque([(message, handler)])
+            await self._scheduler.spawn(self._drain(key))
+
+    async def _drain(self, key: Hashable):
+        queue = self._queues[key]
+        try:
+            while queue:
+                message, handler = queue.popleft()
+                try:
+                    await self._run(message, handler)
+                except Exception:
+                    logger.exception("Failed to process update")
+        finally:
+            # the queue of an idle chat is freed until its next update
+            del self._queues[key]
+
+    def __len__(self) -> int:
+        return len(self._queues)
+
+
+class WorkerPool(Executor):
+    """Handles updates by a fixed number of long-lived workers pulling them from a bounded queue.
+
+    With `ordered` every worker has its own queue and the updates of the same chat always go to the same worker,
+    so they are handled one by one in the order they came.
+    `reserved` is the number of other long-lived jobs of the scheduler, e.g. the poller, the workers never finish,
+    so together they must fit into the limit of the scheduler.
+    """
+
+    def __init__(
+        self,
+        scheduler: Scheduler,
+        run: _RunType,
+        workers: int,
+        queue_size: int,
+        ordered: bool = False,
+        reserved: int = 0,
+    ):
+        if workers < 1:
+            raise BotError("The worker pool needs at least one worker")
+        if scheduler.limit is not None and workers + reserved > scheduler.limit:
+            raise BotError(
+                "The {} workers and {} other jobs exceed the scheduler limit {}".format(
+                    workers, reserved, scheduler.limit
+                )
+            )
+
+        super().__init__(scheduler, run)
+        self._size = workers
+        self._ordered = ordered
+        self._queues = [asyncio.Queue(maxsize=queue_size) for _ in range(workers if ordered else 1)]
+        self._next = itertools.cycle(self._queues)
+        self._workers = []
+
+    async def start(self):
+        for i in range(self._size):
+            queue = self._queues[i % len(self._queues)]
+            self._workers.append(await self._scheduler.spawn(self._work(queue)))
+
+    async def submit(self, message: Message, handler: Handler):
+        if not self._ordered:
+            queue = self._queues[0]
+        elif message.chat_id is None:
+            queue = next(self._next)
+        else:
+            queue = self._queues[hash(message.chat_id) % self._size]
+        await queue.put((message, handler))
+
+    async def close(self):
+        for i in range(self._size):
+            await self._queues[i % len(self._queues)].put(None)
+        for worker in self._workers:
+            await worker.wait()
+        self._workers = []
+
+    async def _work(self, queue: asyncio.Queue):
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            try:
+                await self._run(*item)
+            except Exception:
+                logger.exception("Failed to process update")
+
+    def __len__(self) -> int:
+        return sum(queue.qsize() for queue in self._queues)
@@ -0,0 +1,67 @@
+from typing import Callable, Iterable, List, Optional
+
+from aiotelegrambot.types import get_chat, recognize_incoming
+
+
+class Filters:
+    """Synchronous checks of the raw update before it's routed, an update is dropped if any of them returns `False`"""
+
+    def __init__(self):
+        self._filters: List[Callable[[dict], bool]] = []
+
+    def append(self, fn: Callable[[dict], bool]):
+        self._filters.append(fn)
+
+    def extend(self, *fns: Callable[[dict], bool]):
+        for fn in fns:
+            self.append(fn)
+
+    def __call__(self, raw: dict) -> bool:
+        for fn in self._filters:
+            if not fn(raw):
+                return False
+        return True
+
+    def __bool__(self) -> bool:
+        return bool(self._filters)
+
+
+class _IdFilter:
+    """Keeps the updates by the allowed ids and drops the ones by the denied ids.
+
+    `allowed` is `None` to allow any id. Both sets can be changed at runtime, e.g. `denied.add(user_id)`.
+    Updates without the id, like polls, are kept.
+    """
+
+    def __init__(self, allow: Optional[Iterable[int]] = None, deny: Optional[Iterable[int]] = None):
+        self.allowed = set(allow) if allow is not None else None
+        self.denied = set(deny) if deny is not None else set()
+
+    @staticmethod
+    def _get_id(raw: dict) -> Optional[int]:
+        raise NotImplementedError()
+
+    def __call__(self, raw: dict) -> bool:
+        _id = self._get_id(raw)
+        if _id is None:
+            return True
+        if _id in self.denied:
+            return False
+        return self.allowed is None or _id in self.allowed
+
+
+class ChatFilter(_IdFilter):
+    @staticmethod
+    def _get_id(raw: dict) -> Optional[int]:
+        chat = get_chat(recognize_incoming(raw), raw)
+        return chat["id"] if chat is not None else None
+
+
+class UserFilter(_IdFilter):
+    @staticmethod
+    def _get_id(raw: dict) -> Optional[int]:
+        incoming = recognize_incoming(raw)
+        if incoming is None:
+            return None
+        user = raw[incoming.value].get("from")
+        return user["id"] if user is not None else None
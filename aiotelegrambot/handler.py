@@ -1,8 +1,11 @@
-from collections import defaultdict
-from typing import Callable, Optional
+import re
+from itertools import product
+from typing import Callable, Dict, Optional, Tuple
 
 from aiotelegrambot.errors import HandlerError
-from aiotelegrambot.rules import _RuleType, is_match, prepare_rule
+from aiotelegrambot.routing import Route
+from aiotelegrambot.rules import _RuleType, prepare_rule
+from aiotelegrambot.text import NormalizedText
 from aiotelegrambot.types import Chat, Content, Incoming
 
 
@@ -24,9 +27,8 @@ class Handler:
 
     @property
     def priority(self):
-        if hasattr(self.rule, "priority"):
-            return self.rule.priority
-        return 1000000
+        priority = getattr(self.rule, "priority", None)
+        return priority if priority is not None else 1000000
 
     async def __call__(self, *args, **kwargs):
         if self:
@@ -44,10 +46,21 @@ class Handler:
         )
 
 
+_RouteKey = Tuple[Optional[Chat], Optional[Incoming], Optional[Content]]
+
+
 class Handlers:
-    def __init__(self, handler_cls: type(Handler) = Handler):
+    """Handlers registry.
+
+    `username` is the username of the bot: commands like `/command@username` are handled only if addressed to it,
+    without `username` all of them are ignored.
+    """
+
+    def __init__(self, handler_cls: type(Handler) = Handler, username: Optional[str] = None):
         self._handler_cls = handler_cls
-        self._handlers = defaultdict(lambda: defaultdict(lambda: defaultdict(list)))
+        self._username = username
+        self._handlers: Dict[_RouteKey, list] = {}
+        self._routes: Optional[Dict[_RouteKey, Route]] = None
         self._default_handler = handler_cls()
 
     def get(
@@ -57,13 +70,61 @@ class Handlers:
             content_type: Optional[Content],
             raw: dict
     ) -> Optional[Handler]:
-        for _chat_type in (chat_type, None):
-            for _incoming in (incoming, None):
-                for _content_type in (content_type, None):
-                    for handler in self._handlers[_chat_type][_incoming][_content_type] or []:
-                        if handler.rule is None or is_match(handler.rule, incoming, content_type, raw):
-                            return handler
-        return self._default_handler
+        return self.resolve(chat_type, incoming, content_type, raw)[0]
+
+    def resolve(
+            self,
+            chat_type: Chat,
+            incoming: Incoming,
+            content_type: Optional[Content],
+            raw: dict
+    ) -> Tuple[Handler, Optional[re.Match], Optional[NormalizedText]]:
+        """Get the handler together with the match object of its `RegExp` rule and the normalized text
+        the rules were compared with, if any
+        """
+        routes = self._routes if self._routes is not None else self.compile()
+        route = routes.get((chat_type, incoming, content_type))
+        if route is None:
+            return self._default_handler, None, None
+        value = route.value(incoming, content_type, raw)
+        text = value if isinstance(value, NormalizedText) else None
+        result = route.match_value(value, incoming, raw)
+        if result is not None:
+            return result[0], result[1], text
+        return self._default_handler, None, text
+
+    def compile(self) -> Dict[_RouteKey, Route]:
+        """Build the routing table.
+
+        Every concrete (chat type, incoming, content type) gets the ordered list of candidate handlers
+        with the handlers registered for any chat type, incoming or content type already merged in.
+        """
+        chat_types = {None, *Chat}
+        incomings = {None, *Incoming}
+        content_types = {None, *Content}
+        for chat_type, incoming, content_type in self._handlers:
+            chat_types.add(chat_type)
+            incomings.add(incoming)
+            content_types.add(content_type)
+
+        routes = {}
+        # keys with the same candidates share the route, so its matching steps are built once
+        built: Dict[Tuple[Tuple[Handler, ...], Optional[Incoming]], Route] = {}
+        for key in product(chat_types, incomings, content_types):
+            candidates = []
+            for fallback in product(*((value, None) if value is not None else (None,) for value in key)):
+                candidates.extend(self._handlers.get(fallback, ()))
+            if candidates:
+                candidates = tuple(candidates)
+                # the rules are compared with the value of other updates than messages in their own routes only
+                incoming = key[1] if key[1] is not None and not key[1].is_message_or_post else None
+                route = built.get((candidates, incoming))
+                if route is None:
+                    route = built[(candidates, incoming)] = Route(candidates, self._username, incoming)
+                routes[key] = route
+
+        self._routes = routes
+        return routes
 
     def add(
             self,
@@ -77,17 +138,18 @@ class Handlers:
         if incoming is not None and not incoming.is_message_or_post:
             if content_type is not None:
                 raise HandlerError("The `content_type` allowed only for message or post incoming")
-            elif rule is not None:
-                raise HandlerError("The `rule` allowed only for message or post incoming")
+            elif rule is not None and incoming.value_key is None:
+                raise HandlerError("The `rule` isn't allowed for {} incoming".format(incoming))
 
         if rule is not None:
-            rule = prepare_rule(content_type, rule)
+            rule = prepare_rule(content_type, rule, incoming)
 
         def decorator(handler: Callable):
             if not callable(handler):
                 raise ValueError("The `handler` must be callable type")
 
-            for h in self._handlers[chat_type][incoming][content_type]:
+            key = (chat_type, incoming, content_type)
+            for h in self._handlers.get(key, ()):
                 if h.rule == rule:
                     raise HandlerError(
                         "The handler with chat_type={}, incoming={}, content_type={} and rule `{}` already in.".format(
@@ -95,12 +157,21 @@ class Handlers:
                         )
                     )
 
-            self._handlers[chat_type][incoming][content_type].append(
-                self._handler_cls(handler, chat_type, incoming, content_type, rule)
-            )
-            self._handlers[chat_type][incoming][content_type].sort(key=lambda x: x.priority)
+            # a new list instead of changing the old one, which may be shared with a copy
+            handlers = list(self._handlers.get(key, ()))
+            handlers.append(self._handler_cls(handler, chat_type, incoming, content_type, rule))
+            handlers.sort(key=lambda x: x.priority)
+            self._handlers[key] = handlers
+            self._routes = None
             return handler
         return decorator
 
+    def copy(self) -> "Handlers":
+        """Handlers with the same content, to change them without affecting the ones in use"""
+        handlers = self.__class__(self._handler_cls, self._username)
+        # the lists are never changed in place, so they are shared
+        handlers._handlers = dict(self._handlers)
+        return handlers
+
     def __bool__(self) -> bool:
         return bool(self._handlers)
@@ -1,7 +1,11 @@
+import asyncio
+import re
 from typing import Callable, Optional
 
 from aiotelegrambot.client import Client
-from aiotelegrambot.types import Chat, Content, Incoming
+from aiotelegrambot.entities import Entities
+from aiotelegrambot.text import NormalizedText
+from aiotelegrambot.types import Chat, Content, Incoming, get_chat
 
 
 class Message:
@@ -12,7 +16,10 @@ class Message:
             ctx: dict,
             chat_type: Optional[Chat] = None,
             incoming: Optional[Incoming] = None,
-            content_type: Optional[Content] = None
+            content_type: Optional[Content] = None,
+            webhook_reply: Optional[asyncio.Future] = None,
+            match: Optional[re.Match] = None,
+            text: Optional[NormalizedText] = None
     ):
         self._client = client
         self.raw = raw
@@ -20,16 +27,65 @@ class Message:
         self.chat_type = chat_type
         self.incoming = incoming
         self.content_type = content_type
+        # the match object of the `RegExp` rule of the handler
+        self.match = match
 
         if incoming is not None and incoming.is_message_or_post:
             self._chat_id = raw[incoming.value]["chat"]["id"]
             self._message_id = raw[incoming.value]["message_id"]
         else:
-            self._chat_id = None
-            self._message_id = None
+            chat = get_chat(incoming, raw)
+            self._chat_id = chat["id"] if chat is not None else None
+            # the message with the button of a callback query
+            message = raw[incoming.value].get("message") if incoming is Incoming.CALLBACK_QUERY else None
+            self._message_id = message["message_id"] if message else None
+
+        self._webhook_reply = webhook_reply
+        self._entities: Optional[Entities] = None
+        # the text normalized for the rules is reused, the routed value of other content types isn't the text
+        self._text = text if content_type is Content.TEXT else None
+
+    @property
+    def chat_id(self) -> Optional[int]:
+        return self._chat_id
+
+    @property
+    def message_id(self) -> Optional[int]:
+        return self._message_id
+
+    @property
+    def text(self) -> Optional[NormalizedText]:
+        """The text or the caption of the message with its lowercase, casefold and stripped forms cached"""
+        if self._text is None and self.incoming is not None and self.incoming.is_message_or_post:
+            raw = self.raw[self.incoming.value]
+            text = raw.get("text", raw.get("caption"))
+            if text is not None:
+                self._text = NormalizedText(text)
+        return self._text
+
+    @property
+    def entities(self) -> Entities:
+        """Entities of the message grouped by type, extracted once and shared by handlers and middlewares"""
+        if self._entities is None:
+            is_message = self.incoming is not None and self.incoming.is_message_or_post
+            self._entities = Entities.of(self.raw[self.incoming.value]) if is_message else Entities({})
+        return self._entities
 
     async def send_message(self, text: str, reply_to_message: bool = False):
-        await self._client.send_message(text, self._chat_id, self._message_id if reply_to_message else None)
+        reply_to_message_id = self._message_id if reply_to_message else None
+        if self._webhook_reply is not None and not self._webhook_reply.done():
+            # send the message in the response to the webhook request
+            params = {"method": "sendMessage", "chat_id": self._chat_id, "text": text}
+            if reply_to_message_id:
+                params["reply_to_message_id"] = reply_to_message_id
+            self._webhook_reply.set_result(params)
+            return
+        await self._client.send_message(text, self._chat_id, reply_to_message_id)
+
+    def release_webhook_reply(self):
+        """Let the webhook response go without a method call"""
+        if self._webhook_reply is not None and not self._webhook_reply.done():
+            self._webhook_reply.set_result(None)
 
     @property
     def request(self) -> Callable:
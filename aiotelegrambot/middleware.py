@@ -1,33 +1,139 @@
-from functools import partial
-from typing import Callable
+from typing import Callable, Collection, Dict, Hashable, List, Optional, Tuple
 
 from aiotelegrambot.handler import Handler
 from aiotelegrambot.message import Message
+from aiotelegrambot.rules import Rule, _RuleType, prepare_rule
+from aiotelegrambot.types import Chat, Content, Incoming
 
 
-def _append_middleware(middleware: Callable, prev_middleware: Callable) -> Callable:
-    async def wrapper(message: Message, handler: Callable):
-        _middleware = partial(middleware, handler=handler)
-        await prev_middleware(message, _middleware)
-    return wrapper
+class _Link:
+    """Calls the middleware with the next link of the chain.
+
+    It returns the coroutine of the middleware instead of awaiting it, so a link adds no coroutine frame.
+    """
+
+    __slots__ = ("_middleware", "_next")
+
+    def __init__(self, middleware: Callable, next_link: Callable):
+        self._middleware = middleware
+        self._next = next_link
+
+    def __call__(self, message: Message):
+        return self._middleware(message, self._next)
+
+
+class _Scope:
+    """The updates and the handlers a middleware runs for, `None` is any"""
+
+    __slots__ = ("chat_type", "incoming", "content_type", "rule", "handlers")
+
+    def __init__(
+            self,
+            chat_type: Optional[Chat] = None,
+            incoming: Optional[Incoming] = None,
+            content_type: Optional[Content] = None,
+            rule: Optional[_RuleType] = None,
+            handlers: Optional[Collection[Callable]] = None
+    ):
+        self.chat_type = chat_type
+        self.incoming = incoming
+        self.content_type = content_type
+        # prepared as the rule of a handler, so "/start" with `Content.COMMAND` is `Command("/start")`
+        self.rule = prepare_rule(content_type, rule, incoming)
+        self.handlers = handlers
+
+    def _has_rule(self, handler: Handler) -> bool:
+        rule = getattr(handler, "rule", None)
+        if rule is None:
+            return False
+        if isinstance(self.rule, Rule) or isinstance(rule, Rule):
+            # rules are compared as rules, `==` would match the scope rule against the value of a plain rule
+            return isinstance(self.rule, Rule) and isinstance(rule, Rule) and hash(self.rule) == hash(rule)
+        return self.rule == rule
+
+    def applies(
+            self,
+            handler: Handler,
+            chat_type: Optional[Chat],
+            incoming: Optional[Incoming],
+            content_type: Optional[Content]
+    ) -> bool:
+        return (
+            (self.chat_type is None or self.chat_type == chat_type)
+            and (self.incoming is None or self.incoming == incoming)
+            and (self.content_type is None or self.content_type == content_type)
+            and (self.rule is None or self._has_rule(handler))
+            and (self.handlers is None or getattr(handler, "handler", handler) in self.handlers)
+        )
 
 
 class Middlewares:
+    """Middlewares called in the order they are added, each one with the message and the next callable.
+
+    The chain of every handler is built once for the type of the update and reused for all the updates
+    of the handler and the type. A scoped middleware is left out of the chains it doesn't apply to.
+    """
+
     def __init__(self):
-        self._middleware = None
+        self._middlewares: List[Tuple[Callable, Optional[_Scope]]] = []
+        self._scoped = False
+        # id of the handler (with the type of the update if some middlewares are scoped) -> chain,
+        # the chain holds the handler, so the id isn't reused while it's cached
+        self._chains: Optional[Dict[Hashable, Callable]] = None
 
-    def append(self, fn: Callable):
-        if self._middleware is None:
-            self._middleware = fn
+    def append(
+            self,
+            fn: Callable,
+            chat_type: Optional[Chat] = None,
+            incoming: Optional[Incoming] = None,
+            content_type: Optional[Content] = None,
+            rule: Optional[_RuleType] = None,
+            handlers: Optional[Collection[Callable]] = None
+    ):
+        """Add the middleware, for the updates of the types and for the handlers with the rule or among `handlers`"""
+        if chat_type is None and incoming is None and content_type is None and rule is None and handlers is None:
+            scope = None
         else:
-            self._middleware = _append_middleware(fn, self._middleware)
+            scope = _Scope(chat_type, incoming, content_type, rule, handlers)
+            self._scoped = True
+        self._middlewares.append((fn, scope))
+        self._chains = None
 
     def extend(self, *fns: Callable):
         for fn in fns:
             self.append(fn)
 
+    def compile(self):
+        """Drop the chains built for the previous middlewares and handlers"""
+        self._chains = {}
+
+    def _build(
+            self,
+            handler: Handler,
+            chat_type: Optional[Chat],
+            incoming: Optional[Incoming],
+            content_type: Optional[Content]
+    ) -> Callable:
+        chain = handler
+        for middleware, scope in reversed(self._middlewares):
+            if scope is None or scope.applies(handler, chat_type, incoming, content_type):
+                chain = _Link(middleware, chain)
+        return chain
+
     async def __call__(self, message: Message, handler: Handler):
-        if self._middleware:
-            await self._middleware(message, handler)
-        else:
+        if not self._middlewares:
             await handler(message)
+            return
+        if self._chains is None:
+            self.compile()
+
+        if self._scoped:
+            update_type = (message.chat_type, message.incoming, message.content_type)
+            key = (id(handler), *update_type)
+        else:
+            update_type = (None, None, None)
+            key = id(handler)
+        chain = self._chains.get(key)
+        if chain is None:
+            chain = self._chains[key] = self._build(handler, *update_type)
+        await chain(message)
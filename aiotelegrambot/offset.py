@@ -0,0 +1,134 @@
+import asyncio
+import os
+import sqlite3
+from collections import OrderedDict
+from typing import Optional
+
+
+class OffsetStore:
+    """Persists the offset of the first update which isn't handled yet"""
+
+    def load(self) -> int:
+        raise NotImplementedError()
+
+    def save(self, offset: int):
+        raise NotImplementedError()
+
+    def close(self):
+        pass
+
+
+class FileOffsetStore(OffsetStore):
+    def __init__(self, path: str):
+        self._path = path
+
+    def load(self) -> int:
+        try:
+            with open(self._path, "r") as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def save(self, offset: int):
+        # write a temporary file and replace the old one, so a crash never leaves a broken file
+        tmp_path = self._path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(str(offset))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._path)
+
+
+class SQLiteOffsetStore(OffsetStore):
+    def __init__(self, path: str, name: str = "default"):
+        self._name = name
+        self._connection = sqlite3.connect(path)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS offsets (name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+            )
+
+    def load(self) -> int:
+        row = self._connection.execute("SELECT value FROM offsets WHERE name = ?", (self._name,)).fetchone()
+        return row[0] if row else 0
+
+    def save(self, offset: int):
+        with self._connection:
+            self._connection.execute("INSERT OR REPLACE INTO offsets (name, value) VALUES (?, ?)", (self._name, offset))
+
+    def close(self):
+        self._connection.close()
+
+
+class OffsetTracker:
+    """Tracks the low-water mark of handled updates.
+
+    The offset is the id of the first fetched update which isn't handled yet, or the id next to the last fetched
+    update when all of them are handled. It is saved to the store every `batch_size` handled updates and on commit.
+    """
+
+    def __init__(self, store: OffsetStore, batch_size: int = 100):
+        self._store = store
+        self._batch_size = batch_size
+        self._offset = store.load()
+        self._committed = self._offset
+        self._last = self._offset - 1
+        self._pending = OrderedDict()
+        self._completed = 0
+        self._advanced = asyncio.Event()
+
+    @property
+    def offset(self) -> int:
+        return self._offset
+
+    @property
+    def pending(self) -> int:
+        """The number of fetched updates from the first one which isn't handled yet"""
+        return len(self._pending)
+
+    def add(self, update_id: int) -> bool:
+        """Start tracking the update. Returns `False` if the update was already fetched."""
+        if update_id <= self._last:
+            return False
+        self._last = update_id
+        if not self._pending:
+            self._offset = update_id
+        self._pending[update_id] = False
+        return True
+
+    def done(self, update_id: Optional[int]):
+        if update_id not in self._pending:
+            return
+
+        self._pending[update_id] = True
+        self._completed += 1
+
+        offset = self._offset
+        while self._pending:
+            first_id, is_done = next(iter(self._pending.items()))
+            if not is_done:
+                self._offset = first_id
+                break
+            self._pending.popitem(last=False)
+        else:
+            self._offset = self._last + 1
+
+        if self._offset != offset:
+            self._advanced.set()
+            if self._completed >= self._batch_size:
+                self.commit()
+
+    def commit(self):
+        self._completed = 0
+        if self._offset != self._committed:
+            self._store.save(self._offset)
+            self._committed = self._offset
+
+    async def wait(self):
+        """Wait until the offset moves forward"""
+        self._advanced.clear()
+        await self._advanced.wait()
+
+    def close(self):
+        self.commit()
+        self._store.close()
@@ -0,0 +1,44 @@
+from typing import Optional
+
+import aiohttp
+
+
+class Pool:
+    """Settings of the connection pool to Telegram API.
+
+    All requests go to the single host, so `limit_per_host` only matters for a session shared with other services.
+    Idle connections are kept alive for `keepalive_timeout` seconds and resolved addresses are cached for
+    `ttl_dns_cache` seconds, so a busy bot doesn't pay for a DNS lookup and a TLS handshake per request.
+    aiohttp turns TCP_NODELAY on for every connection itself.
+    """
+
+    def __init__(
+        self,
+        limit: int = 100,
+        limit_per_host: int = 0,
+        keepalive_timeout: float = 30.0,
+        ttl_dns_cache: Optional[int] = 300,
+        use_dns_cache: bool = True,
+    ):
+        if limit < 0 or limit_per_host < 0:
+            raise ValueError("The connection limits can't be negative")
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.ttl_dns_cache = ttl_dns_cache
+        self.use_dns_cache = use_dns_cache
+
+    def connector(self) -> aiohttp.TCPConnector:
+        """Must be called from a running event loop"""
+        return aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=self.ttl_dns_cache,
+            use_dns_cache=self.use_dns_cache,
+        )
+
+    def __repr__(self) -> str:
+        return "Pool(limit={}, limit_per_host={}, keepalive_timeout={}, ttl_dns_cache={}, use_dns_cache={})".format(
+            self.limit, self.limit_per_host, self.keepalive_timeout, self.ttl_dns_cache, self.use_dns_cache
+        )
@@ -0,0 +1,387 @@
+import re
+from collections import deque
+from itertools import groupby
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+from aiotelegrambot.rules import Command, Contains, Mention, Prefix, RegExp, Rule, Text, get_value
+from aiotelegrambot.text import NormalizedText, normalize
+from aiotelegrambot.types import Content, Incoming
+
+if TYPE_CHECKING:
+    from aiotelegrambot.handler import Handler
+
+# the matched handler and the match object of its `RegExp` rule
+_Result = Tuple["Handler", Optional[re.Match]]
+
+
+class _Candidate:
+    """A handler checked with its own rule, without the value of the update unless `uses_value`"""
+
+    __slots__ = ("handler", "uses_value")
+
+    def __init__(self, handler: "Handler", uses_value: bool = True):
+        self.handler = handler
+        self.uses_value = uses_value
+
+    def match(self, value, incoming: Optional[Incoming] = None, raw: Optional[dict] = None) -> Optional[_Result]:
+        rule = self.handler.rule
+        if rule is None:
+            return self.handler, None
+        if not self.uses_value:
+            value = None
+        if isinstance(rule, RegExp):
+            match = rule.match(value) if isinstance(value, str) else None
+            return (self.handler, match) if match is not None else None
+        if isinstance(rule, Rule):
+            return (self.handler, None) if rule.check(value, incoming, raw) else None
+        if value is not None and rule == value:
+            return self.handler, None
+        return None
+
+
+class TextTable:
+    """Consecutive `Text` rules indexed by the normalized text"""
+
+    def __init__(self, handlers: Sequence["Handler"], username: Optional[str] = None):
+        # (insensitive, casefold) -> normalized text -> (position, handler)
+        self._tables: Dict[Tuple[bool, bool], Dict[str, Tuple[int, "Handler"]]] = {}
+        for position, handler in enumerate(handlers):
+            table = self._tables.setdefault((handler.rule.insensitive, handler.rule.casefold), {})
+            table.setdefault(handler.rule.text, (position, handler))
+
+    @staticmethod
+    def accepts(rule: Rule) -> bool:
+        return True
+
+    def _lookup(self, value: str) -> Optional[_Result]:
+        found = None
+        for (insensitive, casefold), table in self._tables.items():
+            other = table.get(normalize(value, insensitive, casefold))
+            if other is not None and (found is None or other[0] < found[0]):
+                found = other
+        return (found[1], None) if found is not None else None
+
+    def match(self, value, incoming: Optional[Incoming] = None, raw: Optional[dict] = None) -> Optional[_Result]:
+        if not isinstance(value, str):
+            return None
+        return self._lookup(value)
+
+
+class CommandTable(TextTable):
+    """Consecutive `Command` rules indexed by the command name.
+
+    A `/command@username` value matches the `/command` rule only if the username is the one of the bot,
+    without the username of the bot every addressed command is taken as addressed to another bot.
+    """
+
+    def __init__(self, handlers: Sequence["Handler"], username: Optional[str] = None):
+        super().__init__(handlers)
+        self._username = username.lower() if username else None
+
+    def match(self, value, incoming: Optional[Incoming] = None, raw: Optional[dict] = None) -> Optional[_Result]:
+        if not isinstance(value, str):
+            return None
+
+        command, _, username = value.partition("@")
+        if username and username.lower() != self._username:
+            return None
+        return self._lookup(command)
+
+
+class _Alternation:
+    """Patterns joined into one alternation: `(pattern1)|(pattern2)|...`"""
+
+    __slots__ = ("_pattern", "_handlers")
+
+    def __init__(self, handlers: Sequence["Handler"]):
+        self._handlers: Dict[int, "Handler"] = {}
+        parts = []
+        index = 1
+        for handler in handlers:
+            parts.append("({})".format(handler.rule.pattern.pattern))
+            self._handlers[index] = handler
+            index += handler.rule.pattern.groups + 1
+        self._pattern = re.compile("|".join(parts))
+
+    def match(self, value: str, incoming: Optional[Incoming] = None, raw: Optional[dict] = None) -> Optional[_Result]:
+        match = self._pattern.match(value)
+        if match is None:
+            return None
+        # the wrapping group of the winning pattern is closed last
+        handler = self._handlers[match.lastindex]
+        return handler, handler.rule.match(value)
+
+
+class RegExpGroup:
+    """Consecutive `RegExp` rules matched in one pass.
+
+    The alternatives are tried in the order of the handlers, so the first matching one is the handler which
+    would win the rule-by-rule check. Only the winning pattern runs again to get the match object of its own groups.
+    """
+
+    # numbered backreferences and conditionals break when the groups of a pattern are renumbered
+    _NUMBERED_REFERENCE = re.compile(r"\\[1-9]|\(\?\(\d")
+
+    def __init__(self, handlers: Sequence["Handler"], username: Optional[str] = None):
+        self._steps: List[object] = []
+        chunk = []
+        names = set()
+        for handler in handlers:
+            groupindex = handler.rule.pattern.groupindex
+            if names.intersection(groupindex):
+                self._add_step(chunk)
+                chunk = []
+                names = set()
+            chunk.append(handler)
+            names.update(groupindex)
+        self._add_step(chunk)
+
+    def _add_step(self, handlers: List["Handler"]):
+        if len(handlers) == 1:
+            self._steps.append(_Candidate(handlers[0]))
+        elif handlers:
+            self._steps.append(_Alternation(handlers))
+
+    @classmethod
+    def accepts(cls, rule: RegExp) -> bool:
+        pattern = rule.pattern
+        return (
+            isinstance(pattern.pattern, str)
+            and pattern.flags == re.UNICODE
+            and cls._NUMBERED_REFERENCE.search(pattern.pattern) is None
+        )
+
+    def match(self, value, incoming: Optional[Incoming] = None, raw: Optional[dict] = None) -> Optional[_Result]:
+        if not isinstance(value, str):
+            return None
+        for step in self._steps:
+            result = step.match(value, incoming, raw)
+            if result is not None:
+                return result
+        return None
+
+
+class _Automaton:
+    """Aho-Corasick automaton of keywords, finds the keyword with the lowest position in one scan of a text"""
+
+    __slots__ = ("_goto", "_fail", "_best")
+
+    def __init__(self, keywords: Sequence[Tuple[str, int]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        # the lowest position of the keywords which end in the state, including ones reached by fail links
+        self._best: List[Optional[int]] = [None]
+        for keyword, position in keywords:
+            state = 0
+            for char in keyword:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._best.append(None)
+                state = next_state
+            if self._best[state] is None:
+                self._best[state] = position
+
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(char, 0)
+                self._fail[next_state] = fail
+                if self._best[fail] is not None and (
+                        self._best[next_state] is None or self._best[fail] < self._best[next_state]
+                ):
+                    self._best[next_state] = self._best[fail]
+
+    def search(self, text: str) -> Optional[int]:
+        goto, fail, best = self._goto, self._fail, self._best
+        found = best[0]
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            position = best[state]
+            if position is not None and (found is None or position < found):
+                found = position
+                if found == 0:
+                    break
+        return found
+
+
+class ContainsGroup:
+    """Consecutive `Contains` rules.
+
+    Many keywords are found by one scan of the text with an automaton for each normalization of the text. A few
+    keywords are faster checked one by one.
+    """
+
+    # the automaton is slower than substring checks below this number of keywords
+    AUTOMATON_THRESHOLD = 128
+
+    def __init__(self, handlers: Sequence["Handler"], username: Optional[str] = None):
+        self._handlers = tuple(handlers)
+        # (insensitive, casefold) normalizations of the text the keywords are searched in
+        self._modes: List[Tuple[bool, bool]] = []
+        # keyword -> index of its normalization
+        self._keywords: List[Tuple[str, int]] = []
+        for handler in self._handlers:
+            mode = (handler.rule.insensitive, handler.rule.casefold)
+            if mode not in self._modes:
+                self._modes.append(mode)
+            self._keywords.append((handler.rule.text, self._modes.index(mode)))
+
+        self._automatons: Optional[List[_Automaton]] = None
+        if len(self._handlers) >= self.AUTOMATON_THRESHOLD:
+            keywords = [[] for _ in self._modes]
+            for position, (text, index) in enumerate(self._keywords):
+                keywords[index].append((text, position))
+            self._automatons = [_Automaton(items) for items in keywords]
+
+    @staticmethod
+    def accepts(rule: Rule) -> bool:
+        return True
+
+    def match(self, value, incoming: Optional[Incoming] = None, raw: Optional[dict] = None) -> Optional[_Result]:
+        if not isinstance(value, str):
+            return None
+        texts = [normalize(value, *mode) for mode in self._modes]
+
+        if self._automatons is None:
+            for handler, (keyword, index) in zip(self._handlers, self._keywords):
+                if keyword in texts[index]:
+                    return handler, None
+            return None
+
+        found = None
+        for text, automaton in zip(texts, self._automatons):
+            position = automaton.search(text)
+            if position is not None and (found is None or position < found):
+                found = position
+                if found == 0:
+                    break
+        return (self._handlers[found], None) if found is not None else None
+
+
+class _PrefixTrie:
+    """Trie of prefixes, finds the matching prefix with the lowest position in one walk along a text"""
+
+    __slots__ = ("_goto", "_end")
+
+    def __init__(self, prefixes: Sequence[Tuple[str, int]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        # the lowest position of the prefixes which end in the state
+        self._end: List[Optional[int]] = [None]
+        for prefix, position in prefixes:
+            state = 0
+            for char in prefix:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._end.append(None)
+                state = next_state
+            if self._end[state] is None:
+                self._end[state] = position
+
+    def search(self, text: str) -> Optional[int]:
+        goto, end = self._goto, self._end
+        found = end[0]
+        state = 0
+        for char in text:
+            if found == 0:
+                break
+            state = goto[state].get(char)
+            if state is None:
+                break
+            position = end[state]
+            if position is not None and (found is None or position < found):
+                found = position
+        return found
+
+
+class PrefixGroup:
+    """Consecutive `Prefix` rules matched by one walk along the text, whatever the number of prefixes"""
+
+    def __init__(self, handlers: Sequence["Handler"], username: Optional[str] = None):
+        self._handlers = tuple(handlers)
+        prefixes: Dict[Tuple[bool, bool], List[Tuple[str, int]]] = {}
+        for position, handler in enumerate(self._handlers):
+            mode = (handler.rule.insensitive, handler.rule.casefold)
+            prefixes.setdefault(mode, []).append((handler.rule.text, position))
+        self._tries = [(mode, _PrefixTrie(items)) for mode, items in prefixes.items()]
+
+    @staticmethod
+    def accepts(rule: Rule) -> bool:
+        return True
+
+    def match(self, value, incoming: Optional[Incoming] = None, raw: Optional[dict] = None) -> Optional[_Result]:
+        if not isinstance(value, str):
+            return None
+
+        found = None
+        for mode, trie in self._tries:
+            position = trie.search(normalize(value, *mode))
+            if position is not None and (found is None or position < found):
+                found = position
+        return (self._handlers[found], None) if found is not None else None
+
+
+# Consecutive rules of these types are matched together in one step
+_GROUPS = {
+    Command: CommandTable,
+    Mention: TextTable,
+    Text: TextTable,
+    Prefix: PrefixGroup,
+    RegExp: RegExpGroup,
+    Contains: ContainsGroup,
+}
+
+
+def _get_group(rule: Optional[Rule]) -> Optional[type]:
+    group = _GROUPS.get(type(rule))
+    return group if group is not None and group.accepts(rule) else None
+
+
+class Route:
+    """Ordered candidate handlers of one (chat type, incoming, content type) compiled into matching steps"""
+
+    def __init__(
+            self, handlers: Sequence["Handler"], username: Optional[str] = None, incoming: Optional[Incoming] = None
+    ):
+        self.handlers = tuple(handlers)
+        self._has_rules = any(handler.rule is not None for handler in self.handlers)
+
+        # the value of an update other than a message or a post (callback data, query...) is compared only
+        # by the rules of the handlers registered for its incoming
+        def uses_value(handler: "Handler") -> bool:
+            return incoming is None or incoming.is_message_or_post or handler.incoming is not None
+
+        self._steps = []
+        for group, items in groupby(self.handlers, key=lambda x: _get_group(x.rule) if uses_value(x) else None):
+            if group is None:
+                self._steps.extend(_Candidate(handler, uses_value(handler)) for handler in items)
+            else:
+                self._steps.append(group(list(items), username))
+
+    def value(self, incoming: Optional[Incoming], content_type: Optional[Content], raw: dict):
+        """The value of the update compared with the rules, a text is normalized once for all the steps"""
+        value = get_value(incoming, content_type, raw) if self._has_rules else None
+        return NormalizedText(value) if isinstance(value, str) else value
+
+    def match(self, incoming: Optional[Incoming], content_type: Optional[Content], raw: dict) -> Optional[_Result]:
+        return self.match_value(self.value(incoming, content_type, raw), incoming, raw)
+
+    def match_value(self, value, incoming: Optional[Incoming], raw: dict) -> Optional[_Result]:
+        for step in self._steps:
+            result = step.match(value, incoming, raw)
+            if result is not None:
+                return result
+        return None
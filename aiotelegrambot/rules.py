@@ -1,20 +1,48 @@
 import re
 from typing import Optional, Union
 
+from aiotelegrambot.entities import Entities, entity_text
 from aiotelegrambot.errors import RuleError
-from aiotelegrambot.types import Content, Incoming
+from aiotelegrambot.text import normalize
+from aiotelegrambot.types import Content, Incoming, get_chat
 
 
 class Rule:
     priority = None
+    # the estimated cost of a check, the cheapest rules of a composite rule are checked first
+    cost = 1
+
+    def check(self, value, incoming: Optional[Incoming] = None, raw: Optional[dict] = None) -> bool:
+        """Check the value of the update, `raw` is the whole update"""
+        return value is not None and self == value
+
+    def __and__(self, other: "_RuleType") -> "And":
+        return And(self, other)
+
+    def __or__(self, other: "_RuleType") -> "Or":
+        return Or(self, other)
+
+    def __invert__(self) -> "Not":
+        return Not(self)
 
 
 class RegExp(Rule):
     priority = 400
+    cost = 10
 
-    def __init__(self, pattern: str):
+    def __init__(self, pattern: Union[str, re.Pattern]):
         self._pattern = re.compile(pattern)
 
+    @property
+    def pattern(self) -> re.Pattern:
+        return self._pattern
+
+    def match(self, value: str) -> Optional[re.Match]:
+        return self._pattern.match(value)
+
+    def check(self, value, incoming: Optional[Incoming] = None, raw: Optional[dict] = None) -> bool:
+        return isinstance(value, str) and self._pattern.match(value) is not None
+
     def __eq__(self, other: Union[str, Rule]) -> bool:
         if isinstance(other, Rule):
             return self.__hash__() == hash(other)
@@ -28,31 +56,76 @@ class RegExp(Rule):
 
 
 class Text(Rule):
+    """Equality with the text.
+
+    With `casefold` the texts are compared in the Unicode caseless form, which is more correct than lowercase
+    for some languages, e.g. "Straße" equals "STRASSE".
+    """
+
     priority = 200
 
-    def __init__(self, text: str, insensitive: bool = True):
-        self._text = text.lower() if insensitive else text
-        self._insensitive = insensitive
+    def __init__(self, text: str, insensitive: bool = True, casefold: bool = False):
+        self._insensitive = insensitive or casefold
+        self._casefold = casefold
+        self._text = normalize(text, self._insensitive, casefold)
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+    @property
+    def insensitive(self) -> bool:
+        return self._insensitive
+
+    @property
+    def casefold(self) -> bool:
+        return self._casefold
 
     def __eq__(self, other: Union[str, Rule]) -> bool:
         if isinstance(other, Rule):
             return self.__hash__() == hash(other)
-        return self._text == (other.lower() if self._insensitive else other)
+        return self._text == normalize(other, self._insensitive, self._casefold)
 
     def __hash__(self) -> int:
+        if self._casefold:
+            return hash((self.__class__, self._text, self._insensitive, self._casefold))
         return hash((self.__class__, self._text, self._insensitive))
 
     def __repr__(self) -> str:
+        if self._casefold:
+            return '{}("{}", casefold=True)'.format(self.__class__.__name__, self._text)
         return '{}("{}", {})'.format(self.__class__.__name__, self._text, self._insensitive)
 
 
 class Contains(Text):
     priority = 300
+    cost = 3
+
+    def __eq__(self, other: Union[str, Rule]) -> bool:
+        if isinstance(other, Rule):
+            return self.__hash__() == hash(other)
+        return self._text in normalize(other, self._insensitive, self._casefold)
+
+    def __hash__(self) -> int:
+        return super().__hash__()
+
+
+class Prefix(Text):
+    """The text starts with the prefix, e.g. the `callback_data` of buttons like "vote:"
+
+    Unlike `Text` it's case sensitive by default.
+    """
+
+    priority = 250
+    cost = 2
+
+    def __init__(self, text: str, insensitive: bool = False, casefold: bool = False):
+        super().__init__(text, insensitive, casefold)
 
     def __eq__(self, other: Union[str, Rule]) -> bool:
         if isinstance(other, Rule):
             return self.__hash__() == hash(other)
-        return self._text in (other.lower() if self._insensitive else other)
+        return normalize(other, self._insensitive, self._casefold).startswith(self._text)
 
     def __hash__(self) -> int:
         return super().__hash__()
@@ -78,11 +151,167 @@ class Mention(Pattern):
     pattern = re.compile(r"^@[A-Za-z0-9_]+$")
 
 
+class ChatId(Rule):
+    """The update comes from one of the chats"""
+
+    priority = 500
+    cost = 0
+
+    def __init__(self, *chat_ids: int):
+        self._chat_ids = frozenset(chat_ids)
+
+    def check(self, value, incoming: Optional[Incoming] = None, raw: Optional[dict] = None) -> bool:
+        chat = get_chat(incoming, raw) if raw is not None else None
+        return chat is not None and chat["id"] in self._chat_ids
+
+    def __eq__(self, other: Union[str, Rule]) -> bool:
+        if isinstance(other, Rule):
+            return self.__hash__() == hash(other)
+        return False
+
+    def __hash__(self) -> int:
+        return hash((self.__class__, self._chat_ids))
+
+    def __repr__(self) -> str:
+        return "ChatId({})".format(", ".join(str(chat_id) for chat_id in sorted(self._chat_ids)))
+
+
+class HasEntity(Rule):
+    """The message or its caption has an entity of the type, with one of the texts if they are given,
+    e.g. `HasEntity(Content.HASHTAG, "#news")`
+
+    The entities are extracted once per update for all the rules and the handler.
+    """
+
+    priority = 350
+    cost = 2
+
+    def __init__(self, entity_type: Union[str, Content], *texts: str, insensitive: bool = True):
+        if isinstance(entity_type, Content):
+            if not entity_type.has_entity:
+                raise RuleError("{} isn't an entity type".format(entity_type))
+            entity_type = entity_type.value[2]
+        self._entity_type = entity_type
+        self._insensitive = insensitive
+        self._texts = frozenset(normalize(text, insensitive) for text in texts)
+
+    def check(self, value, incoming: Optional[Incoming] = None, raw: Optional[dict] = None) -> bool:
+        if incoming is None or not incoming.is_message_or_post or raw is None:
+            return False
+        found = Entities.of(raw[incoming.value]).get(self._entity_type)
+        if not self._texts:
+            return bool(found)
+        return any(normalize(text, self._insensitive) in self._texts for text in found)
+
+    def __eq__(self, other: Union[str, Rule]) -> bool:
+        if isinstance(other, Rule):
+            return self.__hash__() == hash(other)
+        return False
+
+    def __hash__(self) -> int:
+        return hash((self.__class__, self._entity_type, self._texts, self._insensitive))
+
+    def __repr__(self) -> str:
+        texts = "".join(', "{}"'.format(text) for text in sorted(self._texts))
+        return 'HasEntity("{}"{})'.format(self._entity_type, texts)
+
+
+def _check(rule: "_RuleType", value, incoming: Optional[Incoming], raw: Optional[dict]) -> bool:
+    if isinstance(rule, Rule):
+        return rule.check(value, incoming, raw)
+    return value is not None and rule == value
+
+
+class _Composite(Rule):
+    # nested rules of the same type are merged
+    _flatten = True
+
+    def __init__(self, *rules: "_RuleType"):
+        if not rules:
+            raise RuleError("The {} needs at least one rule".format(self.__class__.__name__))
+        flat = []
+        for rule in rules:
+            # And(And(a, b), c) is And(a, b, c)
+            flat.extend(rule.rules if self._flatten and type(rule) is type(self) else (rule,))
+        # the order doesn't change the result, so the cheapest rules go first to short-circuit the expensive ones
+        self._rules = tuple(sorted(flat, key=lambda x: getattr(x, "cost", 1)))
+        self.cost = sum(getattr(rule, "cost", 1) for rule in self._rules)
+
+    @property
+    def rules(self) -> tuple:
+        return self._rules
+
+    def _priorities(self) -> list:
+        # plain values are compared for equality as texts are
+        priorities = (rule.priority if isinstance(rule, Rule) else Text.priority for rule in self._rules)
+        return [priority for priority in priorities if priority is not None]
+
+    def __eq__(self, other: Union[str, Rule]) -> bool:
+        if isinstance(other, Rule):
+            return self.__hash__() == hash(other)
+        return self.check(other)
+
+    def __hash__(self) -> int:
+        # the order of the rules doesn't matter
+        return hash((self.__class__, frozenset(self._rules)))
+
+    def __repr__(self) -> str:
+        return "{}({})".format(self.__class__.__name__, ", ".join(repr(rule) for rule in self._rules))
+
+
+class And(_Composite):
+    """All the rules match"""
+
+    @property
+    def priority(self) -> Optional[int]:
+        # as specific as the most specific rule
+        return min(self._priorities(), default=None)
+
+    def check(self, value, incoming: Optional[Incoming] = None, raw: Optional[dict] = None) -> bool:
+        for rule in self._rules:
+            if not _check(rule, value, incoming, raw):
+                return False
+        return True
+
+
+class Or(_Composite):
+    """Any of the rules matches"""
+
+    @property
+    def priority(self) -> Optional[int]:
+        # as broad as the broadest rule
+        return max(self._priorities(), default=None)
+
+    def check(self, value, incoming: Optional[Incoming] = None, raw: Optional[dict] = None) -> bool:
+        for rule in self._rules:
+            if _check(rule, value, incoming, raw):
+                return True
+        return False
+
+
+class Not(_Composite):
+    """The rule doesn't match"""
+
+    priority = 600
+    _flatten = False
+
+    def __init__(self, rule: "_RuleType"):
+        super().__init__(rule)
+
+    def check(self, value, incoming: Optional[Incoming] = None, raw: Optional[dict] = None) -> bool:
+        return not _check(self._rules[0], value, incoming, raw)
+
+
 _RuleType = Union[Rule, str, int]
 
 
-def prepare_rule(content_type: Optional[Content], rule: _RuleType) -> _RuleType:
-    if content_type == Content.COMMAND and isinstance(rule, str):
+def prepare_rule(content_type: Optional[Content], rule: _RuleType, incoming: Optional[Incoming] = None) -> _RuleType:
+    if isinstance(rule, _Composite):
+        return rule.__class__(*(prepare_rule(content_type, x, incoming) for x in rule.rules))
+    elif incoming is not None and incoming.value_key is not None and isinstance(rule, str):
+        # callback data, queries and payloads are compared as is
+        return Text(rule, False)
+    elif content_type == Content.COMMAND and isinstance(rule, str):
         return Command(rule)
     elif content_type == Content.MENTION and isinstance(rule, str):
         return Mention(rule)
@@ -91,19 +320,22 @@ def prepare_rule(content_type: Optional[Content], rule: _RuleType) -> _RuleType:
     return rule
 
 
-def is_match(rule: Optional[_RuleType], incoming: Incoming, content_type: Content, raw: dict) -> bool:
-    if incoming.is_message_or_post:
-        raw = raw[incoming.value]
-        if content_type.has_entity:
-            key, entity_key, _ = content_type.value
-            entity = raw[entity_key][0]
-            offset = entity["offset"]
-            length = entity["length"]
-            value = raw[key][offset:length]
-        else:
-            key = content_type.value
-            value = raw[key]
-        return rule == value
-
-    # TODO: check other incoming types
-    return False
+def get_value(incoming: Optional[Incoming], content_type: Optional[Content], raw: dict):
+    """Get the value of the update which rules are compared with"""
+    if incoming is None:
+        return None
+    elif not incoming.is_message_or_post:
+        key = incoming.value_key
+        return raw[incoming.value].get(key) if key is not None else None
+    elif content_type is None:
+        return None
+
+    raw = raw[incoming.value]
+    if content_type.has_entity:
+        key, entity_key, _ = content_type.value
+        return entity_text(raw[key], raw[entity_key][0])
+    return raw[content_type.value]
+
+
+def is_match(rule: Optional[_RuleType], incoming: Incoming, content_type: Optional[Content], raw: dict) -> bool:
+    return _check(rule, get_value(incoming, content_type, raw), incoming, raw)
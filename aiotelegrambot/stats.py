@@ -0,0 +1,64 @@
+from typing import Optional
+
+from aiohttp import BaseConnector
+
+
+class PollingStats:
+    """Counters of the polling loop"""
+
+    def __init__(self):
+        self.polls = 0
+        self.empty_polls = 0
+        self.updates = 0
+        self.round_trip_time = 0.0
+        self.last_round_trip_time = 0.0
+        self.idle_time = 0.0
+        self.throttles = 0
+        self.throttled_time = 0.0
+
+    def poll(self, round_trip_time: float, updates: int):
+        self.polls += 1
+        self.updates += updates
+        if not updates:
+            self.empty_polls += 1
+        self.round_trip_time += round_trip_time
+        self.last_round_trip_time = round_trip_time
+
+    def idle(self, seconds: float):
+        self.idle_time += seconds
+
+    def throttle(self, seconds: float):
+        self.throttles += 1
+        self.throttled_time += seconds
+
+    @property
+    def average_round_trip_time(self) -> float:
+        return self.round_trip_time / self.polls if self.polls else 0.0
+
+
+class PoolStats:
+    """Snapshot of the connection pool"""
+
+    def __init__(self, connector: Optional[BaseConnector] = None):
+        self.limit = 0
+        self.limit_per_host = 0
+        self.acquired = 0
+        self.idle = 0
+        self.waiting = 0
+        if connector is not None and not connector.closed:
+            self.limit = connector.limit
+            self.limit_per_host = connector.limit_per_host
+            # aiohttp has no public counters of the pool, and the types of its internals differ between versions
+            self.acquired = len(getattr(connector, "_acquired", ()))
+            self.idle = sum(len(conns) for conns in getattr(connector, "_conns", {}).values())
+            self.waiting = sum(len(waiters) for waiters in getattr(connector, "_waiters", {}).values())
+
+    @property
+    def available(self) -> Optional[int]:
+        """Connections which can be acquired without waiting, `None` if the pool is unlimited"""
+        return max(self.limit - self.acquired, 0) if self.limit else None
+
+    def __repr__(self) -> str:
+        return "PoolStats(limit={}, acquired={}, idle={}, waiting={})".format(
+            self.limit, self.acquired, self.idle, self.waiting
+        )
@@ -0,0 +1,37 @@
+class NormalizedText(str):
+    """A string which computes its normalized forms once, so all the rules checking one update share them"""
+
+    def __init__(self, value: str = ""):
+        super().__init__()
+        self._lowered = None
+        self._casefolded = None
+        self._stripped = None
+
+    @property
+    def lowered(self) -> str:
+        if self._lowered is None:
+            self._lowered = self.lower()
+        return self._lowered
+
+    @property
+    def casefolded(self) -> str:
+        """Unicode caseless form, e.g. "Straße" and "STRASSE" are both "strasse" """
+        if self._casefolded is None:
+            self._casefolded = self.casefold()
+        return self._casefolded
+
+    @property
+    def stripped(self) -> str:
+        if self._stripped is None:
+            self._stripped = self.strip()
+        return self._stripped
+
+
+def normalize(value: str, insensitive: bool = True, casefold: bool = False) -> str:
+    if isinstance(value, NormalizedText):
+        if casefold:
+            return value.casefolded
+        return value.lowered if insensitive else value
+    if casefold:
+        return value.casefold()
+    return value.lower() if insensitive else value
@@ -1,6 +1,6 @@
 from enum import Enum
 from functools import lru_cache
-from typing import List, Optional, Tuple
+from typing import Iterable, List, Optional, Tuple
 
 
 class Chat(Enum):
@@ -16,15 +16,25 @@ class Incoming(Enum):
     EDITED_MESSAGE = "edited_message"
     CHANNEL_POST = "channel_post"
     EDITED_CHANNEL_POST = "edited_channel_post"
+    INLINE_QUERY = "inline_query"
+    CHOSEN_INLINE_RESULT = "chosen_inline_result"
+    CALLBACK_QUERY = "callback_query"
+    SHIPPING_QUERY = "shipping_query"
+    PRE_CHECKOUT_QUERY = "pre_checkout_query"
+    POLL = "poll"
+    POLL_ANSWER = "poll_answer"
+    MY_CHAT_MEMBER = "my_chat_member"
+    CHAT_MEMBER = "chat_member"
+    CHAT_JOIN_REQUEST = "chat_join_request"
 
     @property
     def is_message_or_post(self):
-        return self.name in (
-            self.NEW_MESSAGE.name,
-            self.EDITED_MESSAGE.name,
-            self.CHANNEL_POST.name,
-            self.EDITED_CHANNEL_POST.name
-        )
+        return self._value_ in _MESSAGE_OR_POST
+
+    @property
+    def value_key(self) -> Optional[str]:
+        """The field of the update other than a message or a post which rules are compared with"""
+        return _VALUE_KEYS.get(self._value_)
 
 
 class Content(Enum):
@@ -77,34 +87,76 @@ class Content(Enum):
         return first + second
 
 
+_MESSAGE_OR_POST = frozenset(
+    incoming.value for incoming in (
+        Incoming.NEW_MESSAGE, Incoming.EDITED_MESSAGE, Incoming.CHANNEL_POST, Incoming.EDITED_CHANNEL_POST
+    )
+)
+_VALUE_KEYS = {
+    Incoming.INLINE_QUERY.value: "query",
+    Incoming.CHOSEN_INLINE_RESULT.value: "query",
+    Incoming.CALLBACK_QUERY.value: "data",
+    Incoming.SHIPPING_QUERY.value: "invoice_payload",
+    Incoming.PRE_CHECKOUT_QUERY.value: "invoice_payload",
+}
+_INCOMING_BY_KEY = {incoming.value: incoming for incoming in Incoming}
+_CHAT_BY_TYPE = {chat.value: chat for chat in Chat}
+# the content type of a message starting with an entity by the entity type
+_CONTENT_BY_ENTITY = {content.value[2]: content for content in Content if content.has_entity}
+# the content type of a message by its field, with the position of the content type in the priority order
+_CONTENT_BY_KEY = {
+    content.value: (position, content)
+    for position, content in enumerate(content for content in Content if not content.has_entity)
+}
+
+_UpdateType = Tuple[Optional[Chat], Optional[Incoming], Optional[Content]]
+
+
 def recognize_incoming(raw: dict) -> Optional[Incoming]:
-    for incoming in Incoming:
-        if incoming.value in raw:
+    for key in raw:
+        incoming = _INCOMING_BY_KEY.get(key)
+        if incoming is not None:
             return incoming
+    return None
 
 
-def recognize_type(raw: dict) -> Tuple[Optional[Chat], Optional[Incoming], Optional[Content]]:
+def get_chat(incoming: Optional[Incoming], raw: dict) -> Optional[dict]:
+    """Get the chat of the update, for a callback query it's the chat of the message with the button"""
+    if incoming is None:
+        return None
+    raw = raw[incoming.value]
+    if incoming is Incoming.CALLBACK_QUERY:
+        raw = raw.get("message") or {}
+    return raw.get("chat")
+
+
+def recognize_type(raw: dict) -> _UpdateType:
     incoming = recognize_incoming(raw)
     if incoming is None:
         return None, None, None
     elif not incoming.is_message_or_post:
-        return None, incoming, None
+        chat = get_chat(incoming, raw)
+        return (Chat(chat["type"]) if chat is not None else None), incoming, None
     raw = raw[incoming.value]
 
-    chat_type = Chat(raw["chat"]["type"])
-
-    for content_type in Content.get_by_priority():
-        entity_key = entity_type = None
-        if content_type.has_entity:
-            key, entity_key, entity_type = content_type.value
-        else:
-            key = content_type.value
+    chat_type = raw["chat"]["type"]
+    chat_type = _CHAT_BY_TYPE.get(chat_type) or Chat(chat_type)
 
-        if key in raw:
-            if not entity_key:
+    if "text" in raw and "entities" in raw:
+        entity = raw["entities"][0]
+        if entity["offset"] == 0:
+            content_type = _CONTENT_BY_ENTITY.get(entity["type"])
+            if content_type is not None:
                 return chat_type, incoming, content_type
-            elif entity_key in raw:
-                entity = raw[entity_key][0]
-                if entity["offset"] == 0 and entity["type"] == entity_type:
-                    return chat_type, incoming, content_type
-    return chat_type, incoming, None
+
+    found = None
+    for key in raw:
+        item = _CONTENT_BY_KEY.get(key)
+        if item is not None and (found is None or item[0] < found[0]):
+            found = item
+    return chat_type, incoming, found[1] if found is not None else None
+
+
+def recognize_types(updates: Iterable[dict]) -> List[_UpdateType]:
+    """Recognize the types of a batch of updates, e.g. the result of `getUpdates`"""
+    return [recognize_type(raw) for raw in updates]
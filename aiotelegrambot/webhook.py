@@ -0,0 +1,87 @@
+import asyncio
+import hmac
+import logging
+from typing import Optional
+
+from aiohttp import web
+
+from aiotelegrambot.bot import Bot
+
+logger = logging.getLogger(__name__)
+
+SECRET_TOKEN_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class WebhookHandler:
+    """The aiohttp request handler of Telegram webhook.
+
+    An update is put into the buffer of the bot and acknowledged right away, the bot dispatches it in background.
+    When the buffer is full or there are more than `max_connections` requests being handled, the handler answers
+    with 503, so Telegram delivers the update later.
+
+    With `reply_timeout` the response is delayed up to this number of seconds, so the first `Message.send_message`
+    call of the handler can be sent in the body of the response instead of a separate request to Telegram API.
+    Telegram doesn't report errors of such calls.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        secret_token: Optional[str] = None,
+        max_connections: int = 40,
+        reply_timeout: Optional[float] = None,
+    ):
+        self._bot = bot
+        self._secret_token = secret_token.encode() if secret_token is not None else None
+        self._max_connections = max_connections
+        self._reply_timeout = reply_timeout
+        self._connections = 0
+
+    async def __call__(self, request: web.Request) -> web.Response:
+        if self._secret_token is not None:
+            token = request.headers.get(SECRET_TOKEN_HEADER, "").encode()
+            if not hmac.compare_digest(token, self._secret_token):
+                return web.Response(status=403)
+
+        if self._connections >= self._max_connections:
+            return web.Response(status=503)
+
+        self._connections += 1
+        try:
+            return await self._handle(request)
+        finally:
+            self._connections -= 1
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        try:
+            data = self._bot.client.json_loads(await request.read())
+        except ValueError:
+            logger.warning("Invalid webhook request body")
+            return web.Response(status=400)
+
+        reply = asyncio.get_event_loop().create_future() if self._reply_timeout is not None else None
+        if not self._bot.feed_update(data, reply):
+            return web.Response(status=503)
+
+        if reply is not None:
+            try:
+                payload = await asyncio.wait_for(asyncio.shield(reply), self._reply_timeout)
+            except asyncio.TimeoutError:
+                # the handler will make a usual request, unless it has replied while the timeout was handled
+                payload = None if reply.cancel() else reply.result()
+            if payload is not None:
+                return web.Response(body=self._bot.client.dump_json(payload), content_type="application/json")
+        return web.Response()
+
+
+def create_app(
+    bot: Bot,
+    path: str = "/",
+    secret_token: Optional[str] = None,
+    max_connections: int = 40,
+    reply_timeout: Optional[float] = None,
+) -> web.Application:
+    """Create the aiohttp application which receives updates of the bot at `path`"""
+    app = web.Application()
+    app.router.add_post(path, WebhookHandler(bot, secret_token, max_connections, reply_timeout))
+    return app
@@ -0,0 +1,56 @@
+"""Compares matching `Contains` rules one by one with ContainsGroup and with its automaton alone.
+
+$ PYTHONPATH=. python benchmarks/contains.py
+"""
+import random
+import string
+import timeit
+
+from aiotelegrambot import Content, Handler
+from aiotelegrambot.routing import ContainsGroup, _Automaton, _Candidate
+from aiotelegrambot.rules import Contains
+
+
+async def handler(message):
+    pass
+
+
+def word(rnd, length):
+    return "".join(rnd.choice(string.ascii_lowercase) for _ in range(length))
+
+
+def main():
+    rnd = random.Random(0)
+    texts = [
+        " ".join(word(rnd, rnd.randint(2, 9)) for _ in range(rnd.randint(5, 40))) for _ in range(50)
+    ]
+
+    for count in (10, 100, 200, 500):
+        handlers = [Handler(handler, content_type=Content.TEXT, rule=Contains(word(rnd, 6))) for _ in range(count)]
+        candidates = [_Candidate(h) for h in handlers]
+        group = ContainsGroup(handlers)
+        automaton = ContainsGroup(handlers)
+        automaton._automatons = [_Automaton([(h.rule.text, i) for i, h in enumerate(handlers)])]
+
+        def run_rules():
+            for text in texts:
+                for candidate in candidates:
+                    if candidate.match(text) is not None:
+                        break
+
+        def run_group():
+            for text in texts:
+                group.match(text)
+
+        def run_automaton():
+            for text in texts:
+                automaton.match(text)
+
+        number = 200
+        for name, fn in (("rule by rule", run_rules), ("group", run_group), ("automaton", run_automaton)):
+            elapsed = min(timeit.repeat(fn, number=number, repeat=5))
+            print("{:>4} rules {:<14} {:>8.2f} us/text".format(count, name, elapsed / number / len(texts) * 1e6))
+
+
+if __name__ == "__main__":
+    main()
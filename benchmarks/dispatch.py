@@ -0,0 +1,58 @@
+"""Compares the throughput of the dispatch modes of the bot.
+
+$ PYTHONPATH=. python benchmarks/dispatch.py [number of updates]
+"""
+import asyncio
+import sys
+import time
+
+from aiotelegrambot import Bot, Content, Message
+
+UPDATES = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+
+
+def make_update(update_id: int) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "chat": {"id": update_id % 100, "type": "private"},
+            "text": "hello",
+        },
+    }
+
+
+async def bench(name: str, **options):
+    done = asyncio.Event()
+    handled = 0
+
+    async def handler(message: Message):
+        nonlocal handled
+        handled += 1
+        if handled == UPDATES:
+            done.set()
+
+    bot = Bot(None)
+    bot.add_handler(handler, content_type=Content.TEXT)
+    await bot.initialize(webhook=True, **options)
+
+    updates = [make_update(i) for i in range(UPDATES)]
+    started = time.perf_counter()
+    for update in updates:
+        await bot.process_update(update)
+    await done.wait()
+    elapsed = time.perf_counter() - started
+
+    await bot.close()
+    print("{:<28} {:>10.0f} updates/s".format(name, UPDATES / elapsed))
+
+
+async def main():
+    await bench("aiojobs spawn per update")
+    await bench("aiojobs, ordered by chat", ordered=True)
+    await bench("worker pool (10)", workers=10)
+    await bench("worker pool (10), ordered", workers=10, ordered=True)
+
+
+if __name__ == "__main__":
+    asyncio.get_event_loop().run_until_complete(main())
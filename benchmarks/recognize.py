@@ -0,0 +1,84 @@
+"""Compares the table-driven recognition of update types with the loops over the enums it replaced.
+
+$ PYTHONPATH=. python benchmarks/recognize.py
+"""
+import timeit
+
+from aiotelegrambot import Chat, Content, Incoming
+from aiotelegrambot.types import recognize_types
+
+
+def is_message_or_post(incoming):
+    return incoming.name in (
+        incoming.NEW_MESSAGE.name,
+        incoming.EDITED_MESSAGE.name,
+        incoming.CHANNEL_POST.name,
+        incoming.EDITED_CHANNEL_POST.name
+    )
+
+
+def old_recognize_incoming(raw):
+    for incoming in Incoming:
+        if incoming.value in raw:
+            return incoming
+
+
+def old_recognize_type(raw):
+    incoming = old_recognize_incoming(raw)
+    if incoming is None:
+        return None, None, None
+    elif not is_message_or_post(incoming):
+        return None, incoming, None
+    raw = raw[incoming.value]
+
+    chat_type = Chat(raw["chat"]["type"])
+
+    for content_type in Content.get_by_priority():
+        entity_key = entity_type = None
+        if content_type.has_entity:
+            key, entity_key, entity_type = content_type.value
+        else:
+            key = content_type.value
+
+        if key in raw:
+            if not entity_key:
+                return chat_type, incoming, content_type
+            elif entity_key in raw:
+                entity = raw[entity_key][0]
+                if entity["offset"] == 0 and entity["type"] == entity_type:
+                    return chat_type, incoming, content_type
+    return chat_type, incoming, None
+
+
+def message(**fields):
+    raw = {"message_id": 1, "from": {"id": 1}, "chat": {"id": 1, "type": "private"}, "date": 0}
+    raw.update(fields)
+    return raw
+
+
+def main():
+    updates = [
+        {"update_id": 1, "message": message(text="hello")},
+        {"update_id": 2, "message": message(text="/start", entities=[{"offset": 0, "type": "bot_command"}])},
+        {"update_id": 3, "message": message(photo=[], caption="photo")},
+        {"update_id": 4, "edited_message": message(text="hello", edit_date=0)},
+        {"update_id": 5, "channel_post": message(video_note={})},
+        {"update_id": 6, "message": message(new_chat_members=[])},
+    ] * 17
+
+    assert [old_recognize_type(raw) for raw in updates] == recognize_types(updates)
+
+    def run_old():
+        [old_recognize_type(raw) for raw in updates]
+
+    def run_new():
+        recognize_types(updates)
+
+    number = 200
+    for name, fn in (("enum loops", run_old), ("lookup tables", run_new)):
+        elapsed = min(timeit.repeat(fn, number=number, repeat=5))
+        print("{:<14} {:>8.2f} us/update".format(name, elapsed / number / len(updates) * 1e6))
+
+
+if __name__ == "__main__":
+    main()
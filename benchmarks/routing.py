@@ -0,0 +1,65 @@
+"""Compares the compiled routing table of Handlers with the nested lookup it replaced.
+
+$ PYTHONPATH=. python benchmarks/routing.py
+"""
+import timeit
+from collections import defaultdict
+
+from aiotelegrambot import Chat, Content, Handlers, Incoming
+from aiotelegrambot.rules import is_match
+from aiotelegrambot.types import recognize_type
+
+
+def nested_get(nested, default, chat_type, incoming, content_type, raw):
+    for _chat_type in (chat_type, None):
+        for _incoming in (incoming, None):
+            for _content_type in (content_type, None):
+                for handler in nested[_chat_type][_incoming][_content_type] or []:
+                    if handler.rule is None or is_match(handler.rule, incoming, content_type, raw):
+                        return handler
+    return default
+
+
+async def handler(message):
+    pass
+
+
+def main():
+    handlers = Handlers()
+    for i in range(20):
+        handlers.add(content_type=Content.COMMAND, rule="/command{}".format(i))(handler)
+    handlers.add(chat_type=Chat.GROUP, content_type=Content.TEXT, rule="hello")(handler)
+    handlers.add(content_type=Content.PHOTO)(handler)
+    handlers.add(incoming=Incoming.EDITED_MESSAGE)(handler)
+    handlers.add()(handler)
+
+    nested = defaultdict(lambda: defaultdict(lambda: defaultdict(list)))
+    for (chat_type, incoming, content_type), items in handlers._handlers.items():
+        nested[chat_type][incoming][content_type].extend(items)
+
+    updates = [
+        {"message": {"chat": {"type": "private"}, "text": "hello"}},
+        {"message": {"chat": {"type": "group"}, "text": "hello"}},
+        {"message": {"chat": {"type": "group"}, "photo": []}},
+        {"edited_message": {"chat": {"type": "supergroup"}, "text": "hello"}},
+        {"channel_post": {"chat": {"type": "channel"}, "video": {}}},
+    ]
+    types = [recognize_type(raw) for raw in updates]
+    handlers.compile()
+
+    def run_nested():
+        for raw, (chat_type, incoming, content_type) in zip(updates, types):
+            nested_get(nested, None, chat_type, incoming, content_type, raw)
+
+    def run_compiled():
+        for raw, (chat_type, incoming, content_type) in zip(updates, types):
+            handlers.get(chat_type, incoming, content_type, raw)
+
+    number = 20000
+    for name, fn in (("nested defaultdict", run_nested), ("compiled table", run_compiled)):
+        elapsed = min(timeit.repeat(fn, number=number, repeat=5))
+        print("{:<20} {:>8.2f} us/update".format(name, elapsed / number / len(updates) * 1e6))
+
+
+if __name__ == "__main__":
+    main()
@@ -10,7 +10,7 @@ async def hi(message: Message):
 
 
 async def run(bot: Bot):
-    await bot.initialize()
+    await bot.initialize(poll_timeout=30)
     while True:
         await asyncio.sleep(1)
 
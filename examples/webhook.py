@@ -1,5 +1,4 @@
 import argparse
-import json
 import os
 import ssl
 
@@ -7,6 +6,7 @@ from aiohttp import web
 
 from aiotelegrambot import Bot, Client, Content, Handlers, Message
 from aiotelegrambot.rules import Contains
+from aiotelegrambot.webhook import create_app
 
 handlers = Handlers()
 
@@ -24,20 +24,11 @@ async def hi(message: Message):
     await message.send_message("Hello!")
 
 
-async def webhook_handle(request):
-    bot = request.app["bot"]
-    data = await request.text()
-    await bot.process_update(json.loads(data))
-    return web.Response()
-
-
 async def init_bot(app: web.Application):
-    bot = Bot(Client(TOKEN), handlers)
+    bot = app["bot"]
     await bot.initialize(webhook=True)
     await bot.client.set_webhook(f"https://{HOST}:{PORT}/{TOKEN}", certificate=SSL_PUBLIC_KEY)
 
-    app["bot"] = bot
-
     yield
 
     await bot.client.delete_webhook()
@@ -45,8 +36,9 @@ async def init_bot(app: web.Application):
     await bot.client.close()
 
 
-app = web.Application()
-app.router.add_post(f"/{TOKEN}", webhook_handle)
+bot = Bot(Client(TOKEN), handlers)
+app = create_app(bot, f"/{TOKEN}")
+app["bot"] = bot
 app.cleanup_ctx.extend([init_bot])
 
 context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
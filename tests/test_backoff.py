@@ -0,0 +1,29 @@
+import pytest
+
+from aiotelegrambot.backoff import Backoff
+
+
+def test___init__():
+    b = Backoff()
+    assert (b.base, b.factor, b.cap, b.jitter) == (1.0, 2.0, 30.0, 0.5)
+
+    with pytest.raises(ValueError):
+        Backoff(jitter=2)
+
+
+@pytest.mark.parametrize("attempt, expected", [(0, 1), (1, 1), (2, 2), (3, 4), (5, 16), (6, 30), (100, 30)])
+def test_delay(attempt, expected):
+    assert Backoff(jitter=0).delay(attempt) == expected
+
+
+def test_delay_jitter(mocker):
+    mocker.patch("aiotelegrambot.backoff.random.random", return_value=0.5)
+    assert Backoff(base=4, jitter=0.5).delay(1) == 3
+
+
+def test_delay_retry_after():
+    assert Backoff(cap=1).delay(1, 42) == 42
+
+
+def test___repr__():
+    assert str(Backoff()) == "Backoff(base=1.0, factor=2.0, cap=30.0, jitter=0.5)"
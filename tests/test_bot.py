@@ -1,8 +1,16 @@
+import asyncio
+
+import aiohttp
 import asynctest
 import pytest
 
+from aiotelegrambot import Content
 from aiotelegrambot.bot import Bot
-from aiotelegrambot.errors import BotError
+from aiotelegrambot.errors import BotError, TelegramApiError
+from aiotelegrambot.executor import Executor, OrderedExecutor, WorkerPool
+from aiotelegrambot.handler import Handlers
+from aiotelegrambot.message import Message
+from aiotelegrambot.offset import OffsetTracker, SQLiteOffsetStore
 
 
 @pytest.fixture
@@ -10,6 +18,20 @@ def bot(mocker):
     return Bot(mocker.MagicMock())
 
 
+@pytest.fixture
+def mock_create_scheduler(mocker):
+    def spawn(coro):
+        coro.close()
+        return mocker.MagicMock()
+
+    mock = asynctest.CoroutineMock()
+    mock.return_value.limit = None
+    mock.return_value.spawn = asynctest.CoroutineMock(side_effect=spawn)
+    mock.return_value.close = asynctest.CoroutineMock()
+    mocker.patch("aiotelegrambot.bot.aiojobs.create_scheduler", new=mock)
+    return mock
+
+
 def test___init__(mocker):
     mock_middlewares = mocker.patch("aiotelegrambot.bot.Middlewares")
     client = mocker.MagicMock()
@@ -42,6 +64,9 @@ async def test_initialize(mocker, webhook_value):
 
     assert b._closed is False
     assert b._scheduler is mock_create_scheduler.return_value
+    assert type(b._executor) is Executor
+    assert b._executor._run == b._handle
+    handlers.compile.assert_called_once_with()
     mock_create_scheduler.assert_called_once_with(**scheduler_options)
 
     if webhook_value:
@@ -49,7 +74,75 @@ async def test_initialize(mocker, webhook_value):
         assert mock_get_updates.call_count == 0
     else:
         mock_spawn.assert_called_once_with(mock_get_updates.return_value)
-        mock_get_updates.assert_called_once_with(interval)
+        mock_get_updates.assert_called_once_with(interval, 0, None)
+        assert b._poller is mock_spawn.return_value
+
+
+async def test_initialize_ordered(mocker, mock_create_scheduler):
+    b = Bot(mocker.MagicMock(), mocker.MagicMock())
+
+    await b.initialize(webhook=True, ordered=True)
+
+    assert type(b._executor) is OrderedExecutor
+
+
+async def test_initialize_workers(mocker, mock_create_scheduler):
+    mock_start = mocker.patch("aiotelegrambot.bot.WorkerPool.start", new=asynctest.CoroutineMock())
+    b = Bot(mocker.MagicMock(), mocker.MagicMock())
+
+    await b.initialize(webhook=True, workers=4, queue_size=10)
+
+    assert type(b._executor) is WorkerPool
+    mock_start.assert_called_once_with()
+
+
+@pytest.mark.parametrize(
+    "workers, options",
+    [(4, {"webhook": True}), (4, {}), (3, {"prefetch": 10})],
+)
+async def test_initialize_workers_error(mocker, mock_create_scheduler, workers, options):
+    mock_create_scheduler.return_value.limit = 4
+    b = Bot(mocker.MagicMock(), mocker.MagicMock())
+
+    with pytest.raises(BotError):
+        await b.initialize(workers=workers, **options)
+
+    assert b._closed is True
+    assert b._scheduler is None
+    mock_create_scheduler.return_value.close.assert_called_once_with()
+
+
+async def test_initialize_workers_limit(mocker):
+    b = Bot(mocker.MagicMock(), mocker.MagicMock())
+    b.client.get_updates = asynctest.CoroutineMock(return_value=None)
+
+    # the workers, the poller and the dispatcher take the whole limit
+    await b.initialize(workers=2, prefetch=10, limit=4)
+    await asyncio.sleep(0.01)
+
+    assert b.client.get_updates.call_count > 0
+    assert not b._poller.pending
+    assert not b._dispatcher.pending
+    await b.close()
+
+
+async def test_initialize_prefetch(mocker):
+    mock_create_scheduler = asynctest.CoroutineMock()
+    mock_spawn = mocker.patch.object(mock_create_scheduler.return_value, "spawn", new=asynctest.CoroutineMock())
+    mocker.patch("aiotelegrambot.bot.aiojobs.create_scheduler", new=mock_create_scheduler)
+    b = Bot(mocker.MagicMock(), mocker.MagicMock())
+
+    mock_get_updates = mocker.patch.object(b, "_get_updates", new=mocker.MagicMock())
+    mock_dispatch_updates = mocker.patch.object(b, "_dispatch_updates", new=mocker.MagicMock())
+
+    await b.initialize(prefetch=10)
+
+    assert b._updates.maxsize == 10
+    assert b._dispatcher is mock_spawn.return_value
+    assert b._poller is mock_spawn.return_value
+    assert mock_spawn.call_args_list == [
+        mocker.call(mock_dispatch_updates.return_value), mocker.call(mock_get_updates.return_value)
+    ]
 
 
 async def test_initialize_error(mocker, bot):
@@ -83,15 +176,46 @@ async def test_close(mocker, bot):
 
     bot._closed = False
     bot._update_id = 1
+    mock_poller = mocker.MagicMock()
+    mock_poller.close = asynctest.CoroutineMock()
+    bot._poller = mock_poller
+    mock_executor = bot._executor = mocker.MagicMock()
+    mock_executor.close = asynctest.CoroutineMock()
 
     await bot.close()
 
+    mock_executor.close.assert_called_once_with()
+    assert bot._executor is None
+
     mock_close.assert_called_once_with()
+    mock_poller.close.assert_called_once_with()
+    assert bot._poller is None
     assert bot._closed is True
     assert bot._update_id == 0
     mock_job.wait.assert_called_once_with()
 
 
+async def test_close_prefetch(mocker, bot):
+    mock_scheduler = bot._scheduler = mocker.MagicMock()
+    mock_scheduler.close = asynctest.CoroutineMock()
+    mock_scheduler.__iter__ = mocker.MagicMock(return_value=iter([]))
+    bot._closed = False
+    bot._updates = asynctest.MagicMock()
+    bot._updates.put = asynctest.CoroutineMock()
+    mock_dispatcher = mocker.MagicMock()
+    mock_dispatcher.wait = asynctest.CoroutineMock()
+    bot._dispatcher = mock_dispatcher
+    bot._executor = mocker.MagicMock()
+    bot._executor.close = asynctest.CoroutineMock()
+
+    await bot.close()
+
+    mock_scheduler.close.assert_called_once_with()
+    mock_dispatcher.wait.assert_called_once_with()
+    assert bot._dispatcher is None
+    assert bot._updates is None
+
+
 def test_add_handler(mocker, bot):
     mock_decorator = mocker.MagicMock()
     mock_add = mocker.MagicMock()
@@ -123,12 +247,12 @@ async def test_process_update(mocker, bot):
         "aiotelegrambot.bot.recognize_type",
         return_value=(mock_chat_type, mock_incoming, mock_content_type)
     )
-    mock_spawn = asynctest.CoroutineMock()
-    bot._scheduler = mocker.MagicMock()
-    bot._scheduler.spawn = mock_spawn
+    mock_submit = asynctest.CoroutineMock()
+    bot._executor = mocker.MagicMock()
+    bot._executor.submit = mock_submit
 
-    bot.handlers.get = mocker.MagicMock()
-    bot.middlewares = mocker.MagicMock()
+    mock_handler, mock_match, mock_text = mocker.MagicMock(), mocker.MagicMock(), mocker.MagicMock()
+    bot.handlers.resolve = mocker.MagicMock(return_value=(mock_handler, mock_match, mock_text))
 
     data = mocker.MagicMock()
 
@@ -137,32 +261,61 @@ async def test_process_update(mocker, bot):
     await bot.process_update(data)
 
     mock_recognize_type.assert_called_once_with(data)
-    bot.handlers.get.assert_called_once_with(mock_chat_type, mock_incoming, mock_content_type, data)
-    mock_message.assert_called_once_with(bot.client, data, bot.ctx, mock_chat_type, mock_incoming, mock_content_type)
-    bot.middlewares.assert_called_once_with(mock_message.return_value, bot.handlers.get.return_value)
-    mock_spawn.assert_called_once_with(bot.middlewares.return_value)
+    bot.handlers.resolve.assert_called_once_with(mock_chat_type, mock_incoming, mock_content_type, data)
+    mock_message.assert_called_once_with(
+        bot.client, data, bot.ctx, mock_chat_type, mock_incoming, mock_content_type, None, mock_match, mock_text
+    )
+    mock_submit.assert_called_once_with(mock_message.return_value, mock_handler)
 
 
-async def test__get_updates(mocker, bot):
+@pytest.mark.parametrize("result", [[], [{"update_id": 1}]])
+async def test__get_updates(mocker, bot, result):
     mock_update_id = mocker.MagicMock()
     bot._closed = False
     bot._update_id = mock_update_id
 
-    mock_get_updates = asynctest.CoroutineMock(return_value=bot)
+    mock_get_updates = asynctest.CoroutineMock(return_value={"result": result})
+    bot.client.get_updates = mock_get_updates
+
+    mock_sleep = mocker.patch("aiotelegrambot.bot.asyncio.sleep", new=asynctest.CoroutineMock())
+
+    async def _process_updates(data):
+        bot._closed = True
+
+    mocker.patch.object(bot, "_process_updates", new=_process_updates)
+
+    interval = 0.5
+    await bot._get_updates(interval)
+
+    mock_get_updates.assert_called_once_with(mock_update_id, None, 0)
+    assert bot.polling_stats.polls == 1
+    assert bot.polling_stats.updates == len(result)
+    if result:
+        assert mock_sleep.call_count == 0
+        assert bot.polling_stats.idle_time == 0
+    else:
+        mock_sleep.assert_called_once_with(interval)
+        assert bot.polling_stats.idle_time == interval
+
+
+async def test__get_updates_long_polling(mocker, bot):
+    bot._closed = False
+
+    mock_get_updates = asynctest.CoroutineMock(return_value={"result": []})
     bot.client.get_updates = mock_get_updates
 
     mock_sleep = mocker.patch("aiotelegrambot.bot.asyncio.sleep", new=asynctest.CoroutineMock())
 
-    async def _process_updates(self):
-        self._closed = True
+    async def _process_updates(data):
+        bot._closed = True
 
     mocker.patch.object(bot, "_process_updates", new=_process_updates)
 
-    mock_interval = mocker.MagicMock()
-    await bot._get_updates(mock_interval)
+    await bot._get_updates(0.5, 30, 100)
 
-    mock_get_updates.assert_called_once_with(mock_update_id)
-    mock_sleep.assert_called_once_with(mock_interval)
+    mock_get_updates.assert_called_once_with(0, 100, 30)
+    assert mock_sleep.call_count == 0
+    assert bot.polling_stats.empty_polls == 1
 
 
 @pytest.mark.parametrize("result", [None, [], [{"update_id": 2}]])
@@ -183,3 +336,359 @@ async def test__process_updates(bot, result):
     else:
         assert bot.process_update.call_count == 0
         assert update_id == bot._update_id
+
+
+async def test__process_updates_prefetch(bot):
+    bot.process_update = asynctest.CoroutineMock()
+    bot._updates = asyncio.Queue()
+
+    await bot._process_updates({"result": [{"update_id": 2}, {"update_id": 3}]})
+
+    assert bot.process_update.call_count == 0
+    assert bot._updates.qsize() == 2
+    assert bot._update_id == 4
+
+
+async def test__dispatch_updates(mocker, bot):
+    processed = []
+
+    async def _process_update(raw, webhook_reply):
+        if raw["update_id"] == 1:
+            raise ValueError()
+        processed.append(raw)
+
+    mocker.patch.object(bot, "_process_update", new=_process_update)
+    mock_logger = mocker.patch("aiotelegrambot.bot.logger")
+
+    bot._updates = asyncio.Queue()
+    for item in (({"update_id": 1}, None), ({"update_id": 2}, None), None):
+        bot._updates.put_nowait(item)
+
+    await bot._dispatch_updates()
+
+    assert processed == [{"update_id": 2}]
+    assert mock_logger.exception.call_count == 1
+
+
+async def test_in_flight(mocker, bot, mock_create_scheduler):
+    bot.handlers = mocker.MagicMock()
+    bot.handlers.resolve.return_value = (mocker.MagicMock(), None, None)
+    await bot.initialize(webhook=True, max_in_flight=2)
+
+    bot._executor = mocker.MagicMock()
+    bot._executor.submit = asynctest.CoroutineMock()
+    mocker.patch("aiotelegrambot.bot.recognize_type", return_value=(None, None, None))
+    data = {"update_id": 1}
+
+    await bot.process_update(data)
+    assert bot.in_flight == 1
+    assert bot._capacity.is_set() is True
+
+    await bot.process_update(data)
+    assert bot.in_flight == 2
+    assert bot.queue_depth == 2
+    assert bot._capacity.is_set() is False
+
+    message, handler = bot._executor.submit.call_args[0]
+    handler = asynctest.CoroutineMock()
+    await bot._handle(message, handler)
+    handler.assert_called_once_with(message)
+    assert bot.in_flight == 1
+    assert bot._capacity.is_set() is True
+
+    bot._executor.submit = asynctest.CoroutineMock(side_effect=RuntimeError)
+    with pytest.raises(RuntimeError):
+        await bot.process_update(data)
+    assert bot.in_flight == 1
+
+
+async def test_queue_depth(bot):
+    bot._in_flight = 2
+    assert bot.queue_depth == 2
+
+    bot._updates = asyncio.Queue()
+    bot._updates.put_nowait({})
+    assert bot.queue_depth == 3
+
+
+async def test__wait_capacity(bot):
+    bot._max_in_flight = 1
+    bot._capacity = asyncio.Event()
+
+    asyncio.get_event_loop().call_later(0.01, bot._capacity.set)
+    await bot._wait_capacity()
+
+    assert bot.polling_stats.throttles == 1
+    assert bot.polling_stats.throttled_time > 0
+
+    await bot._wait_capacity()
+    assert bot.polling_stats.throttles == 1
+
+
+async def test_initialize_offset_store(mocker, mock_create_scheduler):
+    store = mocker.MagicMock()
+    store.load.return_value = 10
+    b = Bot(mocker.MagicMock(), mocker.MagicMock())
+
+    await b.initialize(webhook=True, offset_store=store, commit_batch=5)
+
+    assert isinstance(b._offsets, OffsetTracker)
+    assert b._offsets._batch_size == 5
+    assert b._update_id == 10
+
+
+async def test_close_offset_store(mocker, bot):
+    bot._scheduler = mocker.MagicMock()
+    bot._scheduler.close = asynctest.CoroutineMock()
+    bot._scheduler.__iter__ = mocker.MagicMock(return_value=iter([]))
+    bot._executor = mocker.MagicMock()
+    bot._executor.close = asynctest.CoroutineMock()
+    mock_offsets = bot._offsets = mocker.MagicMock()
+    bot._closed = False
+
+    await bot.close()
+
+    mock_offsets.commit.assert_called_once_with()
+    mock_offsets.close.assert_not_called()
+    assert bot._offsets is None
+
+
+async def test_reinitialize_offset_store(tmp_path, bot):
+    bot.add_handler(asynctest.CoroutineMock(__name__="handler"))
+    store = SQLiteOffsetStore(str(tmp_path / "offsets.db"))
+    try:
+        await bot.initialize(webhook=True, offset_store=store)
+        bot._offsets.add(5)
+        bot._offsets.done(5)
+        await bot.close()
+
+        await bot.initialize(webhook=True, offset_store=store)
+        assert bot._update_id == 6
+        await bot.close()
+    finally:
+        store.close()
+
+
+@pytest.mark.parametrize("prefetch", [False, True])
+async def test__process_tracked_updates_error(mocker, bot, prefetch):
+    store = mocker.MagicMock()
+    store.load.return_value = 0
+    bot._offsets = OffsetTracker(store)
+    bot._executor = mocker.MagicMock()
+    bot._executor.submit = asynctest.CoroutineMock()
+    bot._closed = False
+    # the unknown chat type fails the update before it is submitted
+    data = {"update_id": 10, "message": {"chat": {"id": 1, "type": "unknown"}, "message_id": 1, "text": "a"}}
+    reply = asyncio.get_event_loop().create_future()
+
+    if prefetch:
+        bot._updates = asyncio.Queue()
+        await bot._updates.put((data, reply))
+        await bot._updates.put(None)
+        bot._offsets.add(10)
+        await bot._dispatch_updates()
+        assert reply.result() is None
+    else:
+        with pytest.raises(Exception):
+            await bot._process_updates({"result": [data]})
+
+    assert bot._executor.submit.call_count == 0
+    assert bot.in_flight == 0
+    assert not bot._offsets._pending
+    assert bot._offsets.offset == 11
+
+
+async def test__process_tracked_updates(mocker, bot):
+    store = mocker.MagicMock()
+    store.load.return_value = 0
+    bot._offsets = OffsetTracker(store)
+    bot.process_update = asynctest.CoroutineMock()
+
+    await bot._process_updates({"result": [{"update_id": 1}, {"update_id": 2}]})
+
+    assert bot.process_update.call_args_list == [mocker.call({"update_id": 1}), mocker.call({"update_id": 2})]
+    assert bot._update_id == 1
+
+    # the handled update is confirmed, the update being handled comes again and is skipped
+    bot._release(1)
+    bot._in_flight = 1
+    bot.process_update.reset_mock()
+
+    await bot._process_updates({"result": [{"update_id": 2}, {"update_id": 3}]})
+
+    bot.process_update.assert_called_once_with({"update_id": 3})
+    assert bot._update_id == 2
+
+    # only updates being handled came, wait for one of them
+    bot.process_update.reset_mock()
+    asyncio.get_event_loop().call_later(0.01, bot._release, 2)
+
+    await bot._process_updates({"result": [{"update_id": 2}, {"update_id": 3}]})
+
+    assert bot.process_update.call_count == 0
+    assert bot._update_id == 3
+
+
+async def test__process_tracked_updates_handled_during_request(mocker, bot):
+    store = mocker.MagicMock()
+    store.load.return_value = 0
+    bot._offsets = OffsetTracker(store)
+    bot._closed = False
+    bot.process_update = asynctest.CoroutineMock()
+    batch = {"result": [{"update_id": 1}, {"update_id": 2}]}
+    offsets = []
+
+    async def get_updates(offset, limit, timeout):
+        offsets.append(offset)
+        if len(offsets) == 2:
+            # the updates are handled while Telegram still returns them
+            bot._release(1)
+            bot._release(2)
+        elif len(offsets) == 3:
+            bot._closed = True
+            return {"result": []}
+        return batch
+
+    bot.client.get_updates = get_updates
+    bot._in_flight = 2
+    await asyncio.wait_for(bot._get_updates(0), 1)
+
+    assert offsets == [0, 1, 3]
+
+
+@pytest.mark.parametrize("error", ["api", asyncio.TimeoutError(), aiohttp.ClientError()])
+async def test__get_updates_error(mocker, bot, error):
+    bot._closed = False
+    if error == "api":
+        response = mocker.MagicMock()
+        response.status = 429
+        error = TelegramApiError("error", {"ok": False, "parameters": {"retry_after": 7}}, response)
+        retry_after = 7
+    else:
+        retry_after = None
+
+    bot.client.get_updates = asynctest.CoroutineMock(side_effect=[error, error, {"result": []}, error])
+    bot.client.backoff = mocker.MagicMock()
+    mocker.patch("aiotelegrambot.bot.logger")
+
+    async def sleep(delay):
+        if bot.client.get_updates.call_count == 4:
+            bot._closed = True
+
+    mocker.patch("aiotelegrambot.bot.asyncio.sleep", new=sleep)
+
+    await bot._get_updates(0.1)
+
+    # the attempt counter is reset by a successful request
+    assert bot.client.backoff.delay.call_args_list == [
+        mocker.call(1, retry_after), mocker.call(2, retry_after), mocker.call(1, retry_after)
+    ]
+
+
+async def test_initialize_webhook(mocker, bot, mock_create_scheduler):
+    bot.handlers = mocker.MagicMock()
+
+    await bot.initialize(webhook=True)
+
+    assert bot._updates.maxsize == 1000
+    assert bot._dispatcher is not None
+    assert bot._poller is None
+
+
+async def test_feed_update(bot):
+    assert bot.feed_update({"update_id": 1}) is False
+
+    bot._closed = False
+    bot._updates = asyncio.Queue(maxsize=1)
+
+    reply = asyncio.get_event_loop().create_future()
+    assert bot.feed_update({"update_id": 1}, reply) is True
+    assert bot.feed_update({"update_id": 2}) is False
+    assert bot._updates.get_nowait() == ({"update_id": 1}, reply)
+
+
+async def test__handle_webhook_reply(mocker, bot):
+    reply = asyncio.get_event_loop().create_future()
+    message = Message(bot.client, {"update_id": 1}, bot.ctx, webhook_reply=reply)
+    bot._in_flight = 1
+
+    await bot._handle(message, asynctest.CoroutineMock())
+
+    assert reply.result() is None
+    assert bot.in_flight == 0
+
+
+async def test_process_update_duplicate(mocker, bot, mock_create_scheduler):
+    bot.handlers = mocker.MagicMock()
+    bot.handlers.resolve.return_value = (mocker.MagicMock(), None, None)
+    await bot.initialize(webhook=True, dedup_window=16)
+    bot._executor = mocker.MagicMock()
+    bot._executor.submit = asynctest.CoroutineMock()
+    bot._offsets = mocker.MagicMock()
+    mocker.patch("aiotelegrambot.bot.recognize_type", return_value=(None, None, None))
+
+    await bot.process_update({"update_id": 1})
+    assert bot._executor.submit.call_count == 1
+
+    reply = asyncio.get_event_loop().create_future()
+    await bot._process_update({"update_id": 1}, reply)
+    assert bot._executor.submit.call_count == 1
+    bot._offsets.done.assert_called_once_with(1)
+    assert reply.result() is None
+
+
+def test_set_handlers(mocker, bot):
+    handlers = mocker.MagicMock()
+
+    bot.middlewares._chains = {1: 2}
+    bot.set_handlers(handlers)
+
+    assert bot.handlers is handlers
+    assert bot.middlewares._chains == {}
+    handlers.compile.assert_called_once_with()
+
+    with pytest.raises(BotError):
+        bot.set_handlers(Handlers())
+    assert bot.handlers is handlers
+
+
+async def test_set_handlers_running(mocker, bot, mock_create_scheduler):
+    old = asynctest.CoroutineMock(__name__="old")
+    new = asynctest.CoroutineMock(__name__="new")
+    handlers = Handlers()
+    handlers.add()(old)
+    bot.handlers = handlers
+    await bot.initialize(webhook=True)
+    bot._executor = mocker.MagicMock()
+    bot._executor.submit = asynctest.CoroutineMock()
+
+    data = {"update_id": 1, "message": {"chat": {"id": 1, "type": "private"}, "message_id": 1, "text": "a"}}
+    await bot.process_update(data)
+
+    handlers = bot.handlers.copy()
+    handlers.add(content_type=Content.TEXT)(new)
+    bot.set_handlers(handlers)
+    await bot.process_update(dict(data, update_id=2))
+
+    assert [c[0][1].handler for c in bot._executor.submit.call_args_list] == [old, new]
+
+
+async def test_process_update_filtered(mocker, bot, mock_create_scheduler):
+    bot.handlers = mocker.MagicMock()
+    bot.handlers.resolve.return_value = (mocker.MagicMock(), None, None)
+    await bot.initialize(webhook=True)
+    bot._executor = mocker.MagicMock()
+    bot._executor.submit = asynctest.CoroutineMock()
+    bot._offsets = mocker.MagicMock()
+    mock_recognize_type = mocker.patch("aiotelegrambot.bot.recognize_type", return_value=(None, None, None))
+    bot.filters.append(lambda raw: raw["update_id"] != 2)
+
+    await bot.process_update({"update_id": 1})
+    assert bot._executor.submit.call_count == 1
+
+    reply = asyncio.get_event_loop().create_future()
+    await bot._process_update({"update_id": 2}, reply)
+    assert bot._executor.submit.call_count == 1
+    assert mock_recognize_type.call_count == 1
+    bot._offsets.done.assert_called_once_with(2)
+    assert reply.result() is None
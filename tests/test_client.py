@@ -1,9 +1,15 @@
 import json
 
+import asyncio
+
+import aiohttp
 import asynctest
 import pytest
 
 from aiotelegrambot import Client
+from aiotelegrambot.backoff import Backoff
+from aiotelegrambot.errors import TelegramApiError
+from aiotelegrambot.pool import Pool
 
 
 @pytest.fixture
@@ -11,7 +17,7 @@ def response(mocker):
     def make(status: int, data: dict):
         result = mocker.MagicMock()
         result.status = status
-        result.text = asynctest.CoroutineMock(return_value=json.dumps(data))
+        result.read = asynctest.CoroutineMock(return_value=json.dumps(data).encode())
         return result
 
     return make
@@ -25,12 +31,21 @@ def test___init__(mocker):
     token = "TOKEN"
     mock_client_session = mocker.patch("aiohttp.ClientSession")
     mock_client_timeout = mocker.patch("aiohttp.ClientTimeout")
+    mock_connector = mocker.patch("aiotelegrambot.pool.Pool.connector")
     client = Client(token)
 
     assert client._url == "https://api.telegram.org/botTOKEN/"
-    assert client._session == mock_client_session.return_value
+    assert client.retries == 0
+    assert isinstance(client.backoff, Backoff)
+    assert isinstance(client.pool, Pool)
     mock_client_timeout.assert_called_once_with(total=10)
-    mock_client_session.assert_called_once_with(timeout=mock_client_timeout.return_value)
+    mock_client_session.assert_not_called()
+
+    assert client.session is mock_client_session.return_value
+    assert client.session is mock_client_session.return_value
+    mock_client_session.assert_called_once_with(
+        timeout=mock_client_timeout.return_value, connector=mock_connector.return_value
+    )
 
 
 def test__init___kwargs(mocker):
@@ -40,11 +55,18 @@ def test__init___kwargs(mocker):
 
     mock_json_loads = mocker.MagicMock()
     mock_json_serialize = mocker.MagicMock()
-    client = Client(token, json_loads=mock_json_loads, json_serialize=mock_json_serialize)
+    mock_connector = mocker.MagicMock()
+    pool = Pool(limit=10)
+    client = Client(
+        token, json_loads=mock_json_loads, pool=pool, json_serialize=mock_json_serialize, connector=mock_connector
+    )
 
     assert client._json_loads is mock_json_loads
+    assert client.json_loads is mock_json_loads
+    assert client.pool is pool
+    assert client.session is mock_client_session.return_value
     mock_client_session.assert_called_once_with(
-        timeout=mock_client_timeout.return_value, json_serialize=mock_json_serialize
+        timeout=mock_client_timeout.return_value, json_serialize=mock_json_serialize, connector=mock_connector
     )
 
 
@@ -54,28 +76,67 @@ async def test_close(mocker):
     mock_close = mocker.patch("aiohttp.ClientSession.close", new=asynctest.CoroutineMock())
     client = Client(token)
     await client.close()
+    mock_close.assert_not_called()
 
+    assert client.session
+    await client.close()
     mock_close.assert_called_once_with()
+    assert client._session is None
+
+
+async def test_shared_session(mocker, response):
+    mock_response = response(200, {"ok": True})
+    async with aiohttp.ClientSession() as session:
+        mock_request = mocker.patch.object(session, "_request", new=asynctest.CoroutineMock(return_value=mock_response))
+        first = Client("FIRST", session=session)
+        second = Client("SECOND", session=session, timeout=5)
+
+        assert first.session is second.session is session
+        assert await second.call("getMe") == {"ok": True}
+        mock_request.assert_called_once_with(
+            "POST", "https://api.telegram.org/botSECOND/getMe", data=None, timeout=aiohttp.ClientTimeout(total=5)
+        )
+
+        await first.close()
+        await second.close()
+        assert not session.closed
+
+
+async def test_pool_stats():
+    client = Client("TOKEN", pool=Pool(limit=10))
+    assert client.pool_stats.limit == 0
+
+    assert client.session
+    stats = client.pool_stats
+    assert (stats.limit, stats.acquired, stats.available) == (10, 0, 10)
+    await client.close()
 
 
 @pytest.mark.parametrize("param", [None, "offset", "limit", "timeout"])
 async def test_get_updates(mocker, param):
     mocker.patch("aiohttp.ClientSession")
-    mock_request = mocker.patch("aiotelegrambot.Client.request", new=asynctest.CoroutineMock())
+    mock_call = mocker.patch("aiotelegrambot.Client.call", new=asynctest.CoroutineMock())
     client = Client("TOKEN")
 
-    if param:
-        assert await client.get_updates(**{param: 1}) == mock_request.return_value
-        mock_request.assert_called_once_with("get", "getUpdates", raise_exception=True, params={param: 1})
+    if param == "timeout":
+        mock_client_timeout = mocker.patch("aiohttp.ClientTimeout")
+        assert await client.get_updates(timeout=30) == mock_call.return_value
+        mock_client_timeout.assert_called_once_with(total=40)
+        mock_call.assert_called_once_with(
+            "getUpdates", {"timeout": 30}, raise_exception=True, timeout=mock_client_timeout.return_value
+        )
+    elif param:
+        assert await client.get_updates(**{param: 1}) == mock_call.return_value
+        mock_call.assert_called_once_with("getUpdates", {param: 1}, raise_exception=True)
     else:
-        assert await client.get_updates() == mock_request.return_value
-        mock_request.assert_called_once_with("get", "getUpdates", raise_exception=True, params={})
+        assert await client.get_updates() == mock_call.return_value
+        mock_call.assert_called_once_with("getUpdates", {}, raise_exception=True)
 
 
 @pytest.mark.parametrize("has_message", [True, False])
 async def test_send_message(mocker, has_message):
     mocker.patch("aiohttp.ClientSession")
-    mock_request = mocker.patch("aiotelegrambot.Client.request", new=asynctest.CoroutineMock())
+    mock_call = mocker.patch("aiotelegrambot.Client.call", new=asynctest.CoroutineMock())
     client = Client("TOKEN")
 
     mock_text = mocker.MagicMock()
@@ -87,13 +148,32 @@ async def test_send_message(mocker, has_message):
 
     await client.send_message(mock_text, mock_chat_id, mock_message_id)
     if has_message:
-        mock_request.assert_called_once_with(
-            "get",
-            "sendMessage",
-            params={"chat_id": mock_chat_id, "text": mock_text, "reply_to_message_id": mock_message_id},
+        mock_call.assert_called_once_with(
+            "sendMessage", {"chat_id": mock_chat_id, "text": mock_text, "reply_to_message_id": mock_message_id}
         )
     else:
-        mock_request.assert_called_once_with("get", "sendMessage", params={"chat_id": mock_chat_id, "text": mock_text})
+        mock_call.assert_called_once_with("sendMessage", {"chat_id": mock_chat_id, "text": mock_text})
+
+
+@pytest.mark.parametrize("dumps", [json.dumps, lambda data: json.dumps(data).encode()])
+async def test_call(mocker, dumps):
+    mocker.patch("aiohttp.ClientSession")
+    mock_request = mocker.patch("aiotelegrambot.Client.request", new=asynctest.CoroutineMock())
+    client = Client("TOKEN", json_dumps=dumps)
+
+    assert client.json_dumps is dumps
+    assert await client.call("sendMessage", {"chat_id": 1, "text": "привет"}) is mock_request.return_value
+    mock_request.assert_called_once_with(
+        "post",
+        "sendMessage",
+        None,
+        data=json.dumps({"chat_id": 1, "text": "привет"}).encode(),
+        headers={"Content-Type": "application/json"},
+    )
+
+    mock_request.reset_mock()
+    await client.call("getMe", raise_exception=True, timeout=1)
+    mock_request.assert_called_once_with("post", "getMe", True, timeout=1)
 
 
 async def test_set_webhook(mocker):
@@ -118,17 +198,21 @@ async def test_set_webhook_kwargs(mocker):
     mock_certificate = mocker.MagicMock()
     mock_max_connections = mocker.MagicMock()
     mock_allowed_updates = mocker.MagicMock()
+    mock_secret_token = mocker.MagicMock()
 
     expected_kwargs = {
         "params": [
             ("url", mock_url),
             ("max_connections", mock_max_connections),
             ("allowed_updates", mock_dumps.return_value),
+            ("secret_token", mock_secret_token),
         ],
         "data": {"certificate": mock_open.return_value},
     }
 
-    await client.set_webhook(mock_url, mock_certificate, mock_max_connections, mock_allowed_updates)
+    await client.set_webhook(
+        mock_url, mock_certificate, mock_max_connections, mock_allowed_updates, mock_secret_token
+    )
     mock_request.assert_called_once_with("post", "setWebhook", **expected_kwargs)
     mock_open.assert_called_once_with(mock_certificate, "r")
     mock_dumps.assert_called_once_with(mock_allowed_updates)
@@ -140,7 +224,7 @@ async def test_get_webhook_info(mocker):
     client = Client("TOKEN")
 
     await client.get_webhook_info()
-    mock_request.assert_called_once_with("get", "getWebhookInfo")
+    mock_request.assert_called_once_with("post", "getWebhookInfo", None)
 
 
 async def test_delete_webhook(mocker):
@@ -149,7 +233,7 @@ async def test_delete_webhook(mocker):
     client = Client("TOKEN")
 
     await client.delete_webhook()
-    mock_request.assert_called_once_with("get", "deleteWebhook")
+    mock_request.assert_called_once_with("post", "deleteWebhook", None)
 
 
 @pytest.mark.parametrize("data", [{"ok": True}, {"ok": False, "description": "error"}])
@@ -187,3 +271,79 @@ async def test__request_error(mocker, status, response):
         msg = "Unexpected behavior"
 
     mock_process_error.assert_called_once_with(msg, mock_response, data, False)
+
+
+def api_error(status: int, data: dict = None) -> TelegramApiError:
+    response = asynctest.MagicMock()
+    response.status = status
+    return TelegramApiError("error", data, response)
+
+
+@pytest.mark.parametrize("raise_exception", [True, False])
+async def test_request(mocker, raise_exception):
+    mocker.patch("aiohttp.ClientSession")
+    mock__request = mocker.patch("aiotelegrambot.Client._request", new=asynctest.CoroutineMock())
+    client = Client("TOKEN")
+
+    assert await client.request("get", "getMe", raise_exception, params=1) is mock__request.return_value
+    mock__request.assert_called_once_with("get", "getMe", raise_exception, params=1)
+
+
+@pytest.mark.parametrize("error", [asyncio.TimeoutError(), aiohttp.ClientError()])
+async def test_request_error(mocker, error):
+    mocker.patch("aiohttp.ClientSession")
+    mocker.patch("aiotelegrambot.Client._request", new=asynctest.CoroutineMock(side_effect=error))
+    mock_logger = mocker.patch("aiotelegrambot.client.logger")
+    client = Client("TOKEN")
+
+    assert await client.request("get", "getMe") is None
+    assert mock_logger.exception.call_count == 1
+
+    with pytest.raises(type(error)):
+        await client.request("get", "getMe", True)
+
+
+async def test_request_retry(mocker):
+    mocker.patch("aiohttp.ClientSession")
+    errors = [api_error(429, {"parameters": {"retry_after": 3}}), api_error(502), asyncio.TimeoutError()]
+    mock__request = mocker.patch(
+        "aiotelegrambot.Client._request", new=asynctest.CoroutineMock(side_effect=errors + [{"ok": True}])
+    )
+    mock_sleep = mocker.patch("aiotelegrambot.client.asyncio.sleep", new=asynctest.CoroutineMock())
+    client = Client("TOKEN", retries=3, backoff=Backoff(jitter=0))
+
+    assert await client.request("get", "getMe") == {"ok": True}
+    assert mock__request.call_args_list == [mocker.call("get", "getMe", True)] * 3 + [
+        mocker.call("get", "getMe", False)
+    ]
+    assert mock_sleep.call_args_list == [mocker.call(3.0), mocker.call(2.0), mocker.call(4.0)]
+
+
+@pytest.mark.parametrize("raise_exception", [True, False])
+async def test_request_retry_error(mocker, raise_exception):
+    mocker.patch("aiohttp.ClientSession")
+    error = api_error(400, {"ok": False, "description": "Bad Request"})
+    mocker.patch("aiotelegrambot.Client._request", new=asynctest.CoroutineMock(side_effect=error))
+    mock_process_error = mocker.patch("aiotelegrambot.Client.process_error")
+    mock_sleep = mocker.patch("aiotelegrambot.client.asyncio.sleep", new=asynctest.CoroutineMock())
+    client = Client("TOKEN", retries=3)
+
+    if raise_exception:
+        with pytest.raises(TelegramApiError):
+            await client.request("get", "getMe", raise_exception)
+    else:
+        assert await client.request("get", "getMe", raise_exception) is None
+        mock_process_error.assert_called_once_with("error", error.response, error.data, False)
+    assert mock_sleep.call_count == 0
+
+
+async def test_request_retry_exhausted(mocker):
+    mocker.patch("aiohttp.ClientSession")
+    mocker.patch("aiotelegrambot.Client._request", new=asynctest.CoroutineMock(side_effect=aiohttp.ClientError()))
+    mock_sleep = mocker.patch("aiotelegrambot.client.asyncio.sleep", new=asynctest.CoroutineMock())
+    mock_logger = mocker.patch("aiotelegrambot.client.logger")
+    client = Client("TOKEN", retries=2)
+
+    assert await client.request("get", "getMe") is None
+    assert mock_sleep.call_count == 2
+    assert mock_logger.exception.call_count == 1
@@ -0,0 +1,52 @@
+import pytest
+
+from aiotelegrambot.dedup import SeenUpdates
+
+
+def test___init___error():
+    with pytest.raises(ValueError):
+        SeenUpdates(0)
+
+
+def test_add():
+    seen = SeenUpdates(8)
+
+    assert seen.add(10) is True
+    assert seen.add(10) is False
+    assert seen.add(12) is True
+    assert seen.add(11) is True
+    assert seen.add(11) is False
+    assert seen.add(12) is False
+
+    # the window moves forward
+    assert seen.add(18) is True
+    assert seen.add(13) is True
+    assert seen.add(11) is False
+    assert seen.add(12) is False
+    assert seen.add(10) is False
+
+    # updates just older than the window are dropped
+    assert seen.add(3) is False
+
+    # a much older update starts a new sequence
+    assert seen.add(2) is True
+    assert seen.add(2) is False
+    assert seen.add(3) is True
+
+
+def test_add_jump():
+    seen = SeenUpdates(8)
+
+    assert seen.add(1) is True
+    assert seen.add(100) is True
+    assert seen.add(100) is False
+    assert seen.add(99) is True
+    assert seen.add(1) is True
+
+
+def test_add_restart():
+    seen = SeenUpdates(8)
+
+    assert seen.add(10000000) is True
+    # the ids are started over from a lower one
+    assert [seen.add(update_id) for update_id in (5, 6, 7, 6)] == [True, True, True, False]
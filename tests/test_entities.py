@@ -0,0 +1,65 @@
+import pytest
+
+from aiotelegrambot.entities import Entities, entity_text
+from aiotelegrambot.types import Content
+
+
+@pytest.mark.parametrize(
+    "text, offset, length, expected",
+    [
+        ("hi #tag", 3, 4, "#tag"),
+        ("привет #тег", 7, 4, "#тег"),
+        ("😀 #tag", 3, 4, "#tag"),
+        ("😀😀 @user 😀", 5, 5, "@user"),
+        ("#😀", 0, 3, "#😀"),
+    ]
+)
+def test_entity_text(text, offset, length, expected):
+    assert entity_text(text, {"offset": offset, "length": length}) == expected
+
+
+class TestEntities:
+    def test_get(self):
+        message = {
+            "text": "😀 #one @user #two",
+            "entities": [
+                {"type": "hashtag", "offset": 3, "length": 4},
+                {"type": "mention", "offset": 8, "length": 5},
+                {"type": "hashtag", "offset": 14, "length": 4},
+            ],
+            "caption": "see example.com",
+            "caption_entities": [{"type": "url", "offset": 4, "length": 11}],
+        }
+        entities = Entities(message)
+        assert entities._index is None
+
+        assert entities.get(Content.HASHTAG) == ["#one", "#two"]
+        assert entities.get("mention") == ["@user"]
+        assert entities.get(Content.URL) == ["example.com"]
+        assert entities.get("text_link") == []
+        assert "hashtag" in entities
+        assert Content.EMAIL not in entities
+        assert entities
+
+        index = entities._index
+        entities.get("hashtag")
+        assert entities._index is index
+
+    def test_get_not_entity_type(self):
+        with pytest.raises(ValueError):
+            Entities({}).get(Content.TEXT)
+
+    def test_empty(self):
+        entities = Entities({"text": "text"})
+
+        assert not entities
+        assert entities.get(Content.HASHTAG) == []
+
+
+def test_of():
+    message = {"text": "#a", "entities": [{"type": "hashtag", "offset": 0, "length": 2}]}
+    entities = Entities.of(message)
+
+    assert Entities.of(message) is entities
+    assert Entities.of(dict(message)) is not entities
+    assert entities.get(Content.HASHTAG) == ["#a"]
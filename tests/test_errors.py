@@ -1,3 +1,5 @@
+import pytest
+
 from aiotelegrambot.errors import TelegramApiError
 
 
@@ -12,3 +14,15 @@ class TestTelegramApiError:
         assert e.args[0] == mock_msg
         assert e.data == mock_data
         assert e.response == mock_response
+
+    @pytest.mark.parametrize(
+        "data, expected", [(None, None), ({"ok": False}, None), ({"parameters": {"retry_after": 5}}, 5)]
+    )
+    def test_retry_after(self, mocker, data, expected):
+        assert TelegramApiError("error", data, mocker.MagicMock()).retry_after == expected
+
+    @pytest.mark.parametrize("status, expected", [(400, False), (401, False), (429, True), (500, True), (502, True)])
+    def test_is_retryable(self, mocker, status, expected):
+        response = mocker.MagicMock()
+        response.status = status
+        assert TelegramApiError("error", None, response).is_retryable is expected
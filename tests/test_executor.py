@@ -0,0 +1,162 @@
+import asyncio
+
+import aiojobs
+import asynctest
+import pytest
+
+from aiotelegrambot.errors import BotError
+from aiotelegrambot.executor import Executor, OrderedExecutor, WorkerPool
+
+
+def make_message(mocker, chat_id, text=None):
+    message = mocker.MagicMock()
+    message.chat_id = chat_id
+    message.text = text
+    return message
+
+
+class TestExecutor:
+    async def test_submit(self, mocker):
+        scheduler = mocker.MagicMock()
+        scheduler.spawn = asynctest.CoroutineMock()
+        run = mocker.MagicMock()
+        message = mocker.MagicMock()
+        handler = mocker.MagicMock()
+
+        executor = Executor(scheduler, run)
+        await executor.submit(message, handler)
+
+        run.assert_called_once_with(message, handler)
+        scheduler.spawn.assert_called_once_with(run.return_value)
+
+    async def test_close(self, mocker):
+        await Executor(mocker.MagicMock(), mocker.MagicMock()).close()
+
+
+class TestOrderedExecutor:
+    async def test_submit(self, mocker):
+        result = []
+        events = {}
+
+        async def run(message, handler):
+            await events[message.text].wait()
+            result.append(message.text)
+
+        scheduler = await aiojobs.create_scheduler()
+        executor = OrderedExecutor(scheduler, run)
+
+        for chat_id, text in ((1, "1a"), (1, "1b"), (2, "2a"), (None, "none")):
+            events[text] = asyncio.Event()
+            await executor.submit(make_message(mocker, chat_id, text), None)
+
+        assert len(executor) == 2
+
+        # the second update of the chat 1 waits for the first one, other chats aren't blocked
+        for text in ("1b", "2a", "none"):
+            events[text].set()
+        await asyncio.sleep(0.01)
+        assert result == ["2a", "none"]
+
+        events["1a"].set()
+        await asyncio.sleep(0.01)
+        assert result == ["2a", "none", "1a", "1b"]
+        assert len(executor) == 0
+
+        await scheduler.close()
+
+    async def test_submit_error(self, mocker):
+        result = []
+
+        async def run(message, handler):
+            if message.text == "error":
+                raise ValueError()
+            result.append(message.text)
+
+        mock_logger = mocker.patch("aiotelegrambot.executor.logger")
+        scheduler = await aiojobs.create_scheduler()
+        executor = OrderedExecutor(scheduler, run)
+
+        await executor.submit(make_message(mocker, 1, "error"), None)
+        await executor.submit(make_message(mocker, 1, "ok"), None)
+        await asyncio.sleep(0.01)
+
+        assert result == ["ok"]
+        assert mock_logger.exception.call_count == 1
+        assert len(executor) == 0
+
+        await scheduler.close()
+
+
+class TestWorkerPool:
+    async def test___init___error(self, mocker):
+        scheduler = mocker.MagicMock()
+        scheduler.limit = 10
+
+        with pytest.raises(BotError):
+            WorkerPool(scheduler, mocker.MagicMock(), 0, 10)
+
+        with pytest.raises(BotError):
+            WorkerPool(scheduler, mocker.MagicMock(), 11, 10)
+
+        with pytest.raises(BotError):
+            WorkerPool(scheduler, mocker.MagicMock(), 9, 10, reserved=2)
+
+        WorkerPool(scheduler, mocker.MagicMock(), 10, 10)
+        WorkerPool(scheduler, mocker.MagicMock(), 8, 10, reserved=2)
+
+        scheduler.limit = None
+        WorkerPool(scheduler, mocker.MagicMock(), 10, 10, reserved=2)
+
+    @pytest.mark.parametrize("ordered", [True, False])
+    async def test_submit(self, mocker, ordered):
+        result = []
+
+        async def run(message, handler):
+            await asyncio.sleep(0)
+            result.append((message.chat_id, message.text))
+
+        scheduler = await aiojobs.create_scheduler()
+        pool = WorkerPool(scheduler, run, 3, 100, ordered)
+        await pool.start()
+
+        assert len(pool._queues) == (3 if ordered else 1)
+        assert scheduler.active_count == 3
+
+        expected = []
+        for i in range(30):
+            chat_id = i % 4 or None
+            await pool.submit(make_message(mocker, chat_id, str(i)), None)
+            expected.append((chat_id, str(i)))
+
+        await pool.close()
+
+        assert sorted(result, key=lambda x: int(x[1])) == expected
+        assert len(pool) == 0
+        assert len(scheduler) == 0
+        if ordered:
+            for chat_id in (1, 2, 3):
+                assert [x for x in result if x[0] == chat_id] == [x for x in expected if x[0] == chat_id]
+
+        await scheduler.close()
+
+    async def test_submit_error(self, mocker):
+        result = []
+
+        async def run(message, handler):
+            if message.text == "error":
+                raise ValueError()
+            result.append(message.text)
+
+        mock_logger = mocker.patch("aiotelegrambot.executor.logger")
+        scheduler = await aiojobs.create_scheduler()
+        pool = WorkerPool(scheduler, run, 1, 10)
+        await pool.start()
+
+        await pool.submit(make_message(mocker, 1, "error"), None)
+        await pool.submit(make_message(mocker, 1, "ok"), None)
+        await pool.close()
+
+        assert result == ["ok"]
+        assert mock_logger.exception.call_count == 1
+
+        await scheduler.close()
@@ -0,0 +1,70 @@
+import pytest
+
+from aiotelegrambot.filters import ChatFilter, Filters, UserFilter
+
+
+def test_filters(mocker):
+    filters = Filters()
+    assert not filters
+    assert filters({}) is True
+
+    f1 = mocker.MagicMock(return_value=False)
+    f2 = mocker.MagicMock(return_value=True)
+    filters.append(f1)
+    filters.extend(f2)
+
+    assert filters
+    assert filters({"update_id": 1}) is False
+    f1.assert_called_once_with({"update_id": 1})
+    assert f2.call_count == 0
+
+    f1.return_value = True
+    assert filters({"update_id": 1}) is True
+    assert f2.call_count == 1
+
+
+def message(chat_id, user_id=None):
+    raw = {"chat": {"id": chat_id, "type": "group"}}
+    if user_id is not None:
+        raw["from"] = {"id": user_id}
+    return {"update_id": 1, "message": raw}
+
+
+@pytest.mark.parametrize(
+    "allow, deny, raw, expected",
+    [
+        (None, None, message(1), True),
+        (None, [1], message(1), False),
+        (None, [1], message(2), True),
+        ([1], None, message(1), True),
+        ([1], None, message(2), False),
+        ([1], [1], message(1), False),
+        ([1], None, {"update_id": 1, "inline_query": {"id": "1", "query": ""}}, True),
+        ([1], None, {"update_id": 1, "callback_query": {"message": {"chat": {"id": 2}}}}, False),
+        ([1], None, {"update_id": 1}, True),
+    ]
+)
+def test_chat_filter(allow, deny, raw, expected):
+    assert ChatFilter(allow, deny)(raw) is expected
+
+
+@pytest.mark.parametrize(
+    "allow, deny, raw, expected",
+    [
+        (None, [10], message(1, 10), False),
+        (None, [10], message(1, 11), True),
+        ([10], None, message(1, 11), False),
+        ([10], None, message(1), True),
+        (None, [10], {"update_id": 1, "callback_query": {"from": {"id": 10}}}, False),
+    ]
+)
+def test_user_filter(allow, deny, raw, expected):
+    assert UserFilter(allow, deny)(raw) is expected
+
+
+def test_runtime_change():
+    f = UserFilter()
+    assert f(message(1, 10)) is True
+
+    f.denied.add(10)
+    assert f(message(1, 10)) is False
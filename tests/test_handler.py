@@ -1,9 +1,10 @@
 import asynctest
 import pytest
 
-from aiotelegrambot import Content, Handler, Handlers
+from aiotelegrambot import Chat, Content, Handler, Handlers, Incoming
 from aiotelegrambot.errors import HandlerError
-from aiotelegrambot.rules import Text
+from aiotelegrambot.rules import And, ChatId, Contains, Or, Prefix, RegExp, Rule, Text
+from aiotelegrambot.text import NormalizedText
 
 
 class TestHandler:
@@ -29,6 +30,8 @@ class TestHandler:
 
         assert h1.priority == Text.priority
         assert h2.priority == 1000000
+        assert Handler(rule=Rule()).priority == 1000000
+        assert Handler(rule=Or(Rule())).priority == 1000000
 
     async def test___call__(self, mocker):
         h = Handler()
@@ -71,40 +74,185 @@ class TestHandlers:
         assert h._handler_cls is Handler
         assert isinstance(h._default_handler, Handler)
         assert h._default_handler.handler is None
-        h._handlers[1][2][3].append(4)
+        assert h._handlers == {}
+        assert h._routes is None
+        assert h._username is None
 
-    @pytest.mark.parametrize("chat_type", [True, None])
-    @pytest.mark.parametrize("incoming", [True, None])
-    @pytest.mark.parametrize("content_type", [True, None])
+    def test_add_composite_of_values(self):
+        async def handler(message):
+            pass
+
+        handlers = Handlers()
+        handlers.add(rule=Or("a", "b"))(handler)
+        handlers.add()(handler)
+
+        assert [h.priority for h in handlers._handlers[(None, None, None)]] == [Text.priority, 1000000]
+
+    def test_username(self):
+        async def handler():
+            pass
+
+        h = Handlers(username="our_bot")
+        h.add(content_type=Content.COMMAND, rule="/start")(handler)
+        raw = {"message": {"text": "/start@our_bot", "entities": [{"offset": 0, "length": 14}]}}
+
+        assert h.get(Chat.PRIVATE, Incoming.NEW_MESSAGE, Content.COMMAND, raw).handler is handler
+        raw["message"]["text"] = "/start@other_b"
+        assert h.get(Chat.PRIVATE, Incoming.NEW_MESSAGE, Content.COMMAND, raw) is h._default_handler
+
+    @pytest.mark.parametrize("chat_type", [Chat.PRIVATE, None])
+    @pytest.mark.parametrize("incoming", [Incoming.NEW_MESSAGE, None])
+    @pytest.mark.parametrize("content_type", [Content.TEXT, None])
     @pytest.mark.parametrize("rule", [True, None])
     @pytest.mark.parametrize("is_match_value", [True, False])
     def test_get(self, mocker, is_match_value, rule, content_type, incoming, chat_type):
-        chat_type = mocker.MagicMock() if chat_type else None
-        incoming = mocker.MagicMock() if incoming else None
-        content_type = mocker.MagicMock() if content_type else None
         handler = mocker.MagicMock()
-        handler.rule = rule
-        raw = mocker.MagicMock()
+        if rule:
+            handler.rule = mocker.MagicMock()
+            handler.rule.__eq__.return_value = is_match_value
+        else:
+            handler.rule = None
+        raw = {"message": {"text": "text"}}
+
+        h = Handlers()
+        h._handlers[(chat_type, incoming, content_type)] = [handler]
 
-        mock_is_match = mocker.patch("aiotelegrambot.handler.is_match", return_value=is_match_value)
+        assert h.get(Chat.PRIVATE, Incoming.NEW_MESSAGE, Content.TEXT, raw) == (
+            handler if rule is None or is_match_value is True else h._default_handler
+        )
+
+        if rule is not None:
+            handler.rule.__eq__.assert_called_once_with("text")
+
+    def test_resolve(self):
+        async def handler():
+            pass
 
         h = Handlers()
-        h._handlers[chat_type][incoming][content_type].append(handler)
+        h.add(content_type=Content.TEXT, rule=RegExp(r"(\d+) apples"))(handler)
 
-        _incoming = incoming if incoming else 1
-        _content_type = content_type if content_type else 1
+        found, match, text = h.resolve(
+            Chat.PRIVATE, Incoming.NEW_MESSAGE, Content.TEXT, {"message": {"text": "3 apples"}}
+        )
+        assert found.handler is handler
+        assert match.group(1) == "3"
+        assert isinstance(text, NormalizedText)
+        assert text == "3 apples"
 
-        assert h.get(
-            chat_type if chat_type else 1,
-            _incoming,
-            content_type if content_type else 1,
-            raw
-        ) == (handler if rule is None or is_match_value is True else h._default_handler)
+        found, match, text = h.resolve(Chat.PRIVATE, Incoming.NEW_MESSAGE, Content.TEXT, {"message": {"text": "pears"}})
+        assert (found, match, text) == (h._default_handler, None, "pears")
 
-        if rule is None:
-            assert mock_is_match.call_count == 0
-        else:
-            mock_is_match.assert_called_once_with(handler.rule, _incoming, _content_type, raw)
+        assert h.resolve(Chat.PRIVATE, Incoming.NEW_MESSAGE, Content.PHOTO, {"message": {"photo": []}}) == (
+            h._default_handler, None, None
+        )
+
+    def test_get_callback_query(self):
+        async def handler():
+            pass
+
+        async def vote():
+            pass
+
+        async def page():
+            pass
+
+        h = Handlers()
+        h.add(incoming=Incoming.CALLBACK_QUERY, rule="close")(handler)
+        h.add(incoming=Incoming.CALLBACK_QUERY, rule=Prefix("vote:"))(vote)
+        h.add(incoming=Incoming.CALLBACK_QUERY, rule=Prefix("page:"))(page)
+
+        def get(data):
+            raw = {"callback_query": {"id": "1", "data": data}}
+            return h.get(None, Incoming.CALLBACK_QUERY, None, raw).handler
+
+        assert get("close") is handler
+        assert get("vote:1") is vote
+        assert get("page:2") is page
+        assert get("other") is None
+
+    def test_get_message_rules_on_other_updates(self):
+        async def spam():
+            pass
+
+        async def hi():
+            pass
+
+        async def chat():
+            pass
+
+        async def handler():
+            pass
+
+        h = Handlers()
+        h.add(rule=Contains("spam"))(spam)
+        h.add(rule="hi")(hi)
+        h.add(rule=ChatId(1))(chat)
+
+        raw = {"callback_query": {"id": "1", "data": "spam", "message": {"chat": {"id": 2}, "message_id": 1}}}
+        assert h.get(Chat.PRIVATE, Incoming.CALLBACK_QUERY, None, raw) is h._default_handler
+        raw = {"inline_query": {"id": "1", "query": "hi"}}
+        assert h.get(None, Incoming.INLINE_QUERY, None, raw) is h._default_handler
+        # the rules of the update itself still work
+        raw = {"callback_query": {"id": "1", "data": "spam", "message": {"chat": {"id": 1}, "message_id": 1}}}
+        assert h.get(Chat.PRIVATE, Incoming.CALLBACK_QUERY, None, raw).handler is chat
+
+        h.add(incoming=Incoming.CALLBACK_QUERY, rule=Contains("spam"))(handler)
+        assert h.get(Chat.PRIVATE, Incoming.CALLBACK_QUERY, None, raw).handler is handler
+
+    def test_get_composite(self):
+        async def admin():
+            pass
+
+        async def handler():
+            pass
+
+        h = Handlers()
+        h.add(content_type=Content.COMMAND, rule=And("/stats", ChatId(1)))(admin)
+        h.add(content_type=Content.COMMAND, rule="/stats")(handler)
+
+        def get(chat_id):
+            raw = {"message": {"chat": {"id": chat_id}, "text": "/stats", "entities": [{"offset": 0, "length": 6}]}}
+            return h.get(Chat.PRIVATE, Incoming.NEW_MESSAGE, Content.COMMAND, raw).handler
+
+        assert get(1) is admin
+        assert get(2) is handler
+
+    def test_get_no_mutation(self):
+        h = Handlers()
+        h.get(Chat.PRIVATE, Incoming.NEW_MESSAGE, Content.TEXT, {})
+        h.get(None, None, None, {})
+
+        assert h._handlers == {}
+        assert h._routes == {}
+
+    def test_compile(self):
+        def handler():
+            pass
+
+        h = Handlers()
+        h.add(chat_type=Chat.PRIVATE, content_type=Content.TEXT, rule="b")(handler)
+        h.add(content_type=Content.TEXT, rule="a")(handler)
+        h.add()(handler)
+        h.add(chat_type=Chat.PRIVATE, incoming=Incoming.NEW_MESSAGE, content_type=Content.TEXT)(handler)
+        assert h._routes is None
+
+        routes = h.compile()
+        assert h._routes is routes
+
+        # the most specific handlers go first
+        assert [x.rule for x in routes[(Chat.PRIVATE, Incoming.NEW_MESSAGE, Content.TEXT)].handlers] == [
+            None, Text("b"), Text("a"), None
+        ]
+        assert [x.rule for x in routes[(Chat.GROUP, Incoming.NEW_MESSAGE, Content.TEXT)].handlers] == [
+            Text("a"), None
+        ]
+        assert [x.rule for x in routes[(Chat.GROUP, Incoming.NEW_MESSAGE, Content.PHOTO)].handlers] == [None]
+        assert [x.rule for x in routes[(None, None, None)].handlers] == [None]
+        # routes with the same candidates are built once
+        assert routes[(Chat.GROUP, Incoming.NEW_MESSAGE, Content.PHOTO)] is routes[(None, None, None)]
+
+        h.add(chat_type=Chat.GROUP)(handler)
+        assert h._routes is None
 
     def test_add(self, mocker):
         mock_prepare_rule = mocker.patch("aiotelegrambot.handler.prepare_rule")
@@ -123,8 +271,8 @@ class TestHandlers:
 
         result = h.add(chat_type=chat_type, incoming=incoming, content_type=content_type, rule=rule)(handler)
         assert result is handler
-        assert len(h._handlers[chat_type][incoming][content_type]) == 1
-        assert h._handlers[chat_type][incoming][content_type][0] is mock_handler_cls.return_value
+        assert len(h._handlers[(chat_type, incoming, content_type)]) == 1
+        assert h._handlers[(chat_type, incoming, content_type)][0] is mock_handler_cls.return_value
         mock_handler_cls.assert_called_once_with(
             handler, chat_type, incoming, content_type, mock_prepare_rule.return_value
         )
@@ -152,7 +300,7 @@ class TestHandlers:
         h.add(chat_type=chat_type, incoming=incoming, content_type=content_type, rule=rule1)(handler)
         h.add(chat_type=chat_type, incoming=incoming, content_type=content_type, rule=rule2)(handler)
 
-        handlers = h._handlers[chat_type][incoming][content_type]
+        handlers = h._handlers[(chat_type, incoming, content_type)]
         assert handlers[0].priority == rule1.priority
         assert handlers[1].priority == rule2.priority
         assert handlers[2].priority == rule3.priority
@@ -172,6 +320,7 @@ class TestHandlers:
 
         incoming = mocker.MagicMock()
         incoming.is_message_or_post = False
+        incoming.value_key = None
 
         with pytest.raises(HandlerError):
             h.add(incoming=incoming, rule="/help")
@@ -192,7 +341,7 @@ class TestHandlers:
         rule = "/help"
         with pytest.raises(ValueError):
             h.add(incoming=incoming, content_type=content_type, rule=rule)(None)
-        mock_prepare_rule.assert_called_once_with(content_type, rule)
+        mock_prepare_rule.assert_called_once_with(content_type, rule, incoming)
 
         ##################################
 
@@ -203,14 +352,32 @@ class TestHandlers:
         rule = None
         handler = mocker.MagicMock()
         handler.rule = rule
-        h._handlers[chat_type][incoming][content_type].append(handler)
+        h._handlers[(chat_type, incoming, content_type)] = [handler]
         with pytest.raises(HandlerError):
             h.add(chat_type=chat_type, incoming=incoming, content_type=content_type, rule=rule)(handler)
         assert mock_prepare_rule.call_count == 1
 
+    def test_copy(self):
+        async def handler():
+            pass
+
+        h = Handlers(username="bot")
+        h.add(content_type=Content.TEXT, rule="a")(handler)
+        old_routes = h.compile()
+        old_list = h._handlers[(None, None, Content.TEXT)]
+
+        copy = h.copy()
+        copy.add(content_type=Content.TEXT, rule="b")(handler)
+
+        assert copy._username == "bot"
+        assert [x.rule for x in copy._handlers[(None, None, Content.TEXT)]] == [Text("a"), Text("b")]
+        assert h._handlers[(None, None, Content.TEXT)] is old_list
+        assert [x.rule for x in old_list] == [Text("a")]
+        assert h._routes is old_routes
+
     def test___bool__(self):
         h = Handlers()
         assert bool(h) is False
 
-        h._handlers[1][2][3].append(4)
+        h._handlers[(1, 2, 3)] = [4]
         assert bool(h) is True
@@ -1,7 +1,10 @@
+import asyncio
+
 import asynctest
 
 from aiotelegrambot.message import Message
-from aiotelegrambot.types import Incoming
+from aiotelegrambot.text import NormalizedText
+from aiotelegrambot.types import Content, Incoming
 
 
 def test___init__(mocker):
@@ -31,6 +34,9 @@ def test___init__(mocker):
     assert m.ctx is ctx
     assert m._chat_id is chat_id
     assert m._message_id is message_id
+    assert m.chat_id is chat_id
+    assert m.message_id is message_id
+    assert m.match is None
 
     ##################################
 
@@ -41,12 +47,26 @@ def test___init__(mocker):
 
     ##################################
 
-    incoming = mocker.MagicMock()
-    incoming.is_message_or_post = False
-    m = Message(client, raw, ctx, chat_type, incoming, content_type)
+    incoming = Incoming.INLINE_QUERY
+    m = Message(client, {incoming.value: {"id": "1", "query": "q"}}, ctx, chat_type, incoming, content_type)
     assert m._chat_id is None
     assert m._message_id is None
 
+    ##################################
+
+    incoming = Incoming.CALLBACK_QUERY
+    raw = {incoming.value: {"id": "1", "data": "d", "message": {"message_id": message_id, "chat": {"id": chat_id}}}}
+    m = Message(client, raw, ctx, chat_type, incoming, content_type)
+    assert m._chat_id is chat_id
+    assert m._message_id is message_id
+
+    ##################################
+
+    incoming = Incoming.MY_CHAT_MEMBER
+    m = Message(client, {incoming.value: {"chat": {"id": chat_id}}}, ctx, chat_type, incoming, content_type)
+    assert m._chat_id is chat_id
+    assert m._message_id is None
+
 
 async def test_send_message(mocker):
     client = mocker.MagicMock()
@@ -82,3 +102,89 @@ def test_request(mocker):
     client.request = mocker.MagicMock()
     m = Message(client, mocker.MagicMock(), mocker.MagicMock())
     assert m.request is client.request
+
+
+async def test_send_message_webhook_reply(mocker):
+    client = mocker.MagicMock()
+    client.send_message = asynctest.CoroutineMock()
+    incoming = Incoming.NEW_MESSAGE
+    raw = {incoming.value: {"chat": {"id": 1}, "message_id": 2}}
+    reply = asyncio.get_event_loop().create_future()
+
+    m = Message(client, raw, {}, incoming=incoming, webhook_reply=reply)
+    await m.send_message("text", True)
+
+    assert reply.result() == {"method": "sendMessage", "chat_id": 1, "text": "text", "reply_to_message_id": 2}
+    assert client.send_message.call_count == 0
+
+    # the second call goes to Telegram API
+    await m.send_message("text")
+    client.send_message.assert_called_once_with("text", 1, None)
+
+    ##################################
+
+    client.send_message = asynctest.CoroutineMock()
+    reply = asyncio.get_event_loop().create_future()
+    reply.cancel()
+
+    m = Message(client, raw, {}, incoming=incoming, webhook_reply=reply)
+    await m.send_message("text")
+    client.send_message.assert_called_once_with("text", 1, None)
+
+
+async def test_release_webhook_reply(mocker):
+    Message(mocker.MagicMock(), {}, {}).release_webhook_reply()
+
+    reply = asyncio.get_event_loop().create_future()
+    m = Message(mocker.MagicMock(), {}, {}, webhook_reply=reply)
+    m.release_webhook_reply()
+    assert reply.result() is None
+
+    m.release_webhook_reply()
+
+
+def test_entities(mocker):
+    raw = {
+        Incoming.NEW_MESSAGE.value: {
+            "chat": {"id": 1},
+            "message_id": 1,
+            "text": "#tag",
+            "entities": [{"type": "hashtag", "offset": 0, "length": 4}],
+        }
+    }
+    m = Message(mocker.MagicMock(), raw, {}, incoming=Incoming.NEW_MESSAGE)
+
+    assert m.entities.get("hashtag") == ["#tag"]
+    assert m.entities is m.entities
+
+    m = Message(mocker.MagicMock(), {}, {})
+    assert not m.entities
+
+
+def test_text(mocker):
+    raw = {Incoming.NEW_MESSAGE.value: {"chat": {"id": 1}, "message_id": 1, "text": " Hello "}}
+    m = Message(mocker.MagicMock(), raw, {}, incoming=Incoming.NEW_MESSAGE)
+
+    assert m.text == " Hello "
+    assert m.text.lowered == " hello "
+    assert m.text.stripped == "Hello"
+    assert m.text is m.text
+
+    raw = {Incoming.NEW_MESSAGE.value: {"chat": {"id": 1}, "message_id": 1, "caption": "Photo"}}
+    assert Message(mocker.MagicMock(), raw, {}, incoming=Incoming.NEW_MESSAGE).text == "Photo"
+
+    raw = {Incoming.NEW_MESSAGE.value: {"chat": {"id": 1}, "message_id": 1, "sticker": {}}}
+    assert Message(mocker.MagicMock(), raw, {}, incoming=Incoming.NEW_MESSAGE).text is None
+    assert Message(mocker.MagicMock(), {}, {}).text is None
+
+
+def test_text_routed(mocker):
+    raw = {Incoming.NEW_MESSAGE.value: {"chat": {"id": 1}, "message_id": 1, "text": "/start now"}}
+    text = NormalizedText("/start now")
+    m = Message(mocker.MagicMock(), raw, {}, incoming=Incoming.NEW_MESSAGE, content_type=Content.TEXT, text=text)
+    assert m.text is text
+
+    # the routed value of a command is the command only
+    command = NormalizedText("/start")
+    m = Message(mocker.MagicMock(), raw, {}, incoming=Incoming.NEW_MESSAGE, content_type=Content.COMMAND, text=command)
+    assert m.text == "/start now"
@@ -1,4 +1,8 @@
+import pytest
+
+from aiotelegrambot import Chat, Content, Handler, Incoming
 from aiotelegrambot.middleware import Middlewares
+from aiotelegrambot.rules import Command, Contains, RegExp, Text
 
 
 async def test_no_middlewares():
@@ -86,3 +90,149 @@ async def test_three_middlewares():
     await m(0, handler)
 
     assert result == expected
+
+
+async def test_chain_cache():
+    result = []
+
+    async def handler(message):
+        result.append(message)
+
+    async def mw1(message, next_handler):
+        result.append("mw1")
+        await next_handler(message)
+
+    async def mw2(message, handler):
+        result.append("mw2")
+        await handler(message)
+
+    m = Middlewares()
+    m.append(mw1)
+    await m(0, handler)
+    chain = m._chains[id(handler)]
+    await m(1, handler)
+
+    assert m._chains[id(handler)] is chain
+    assert result == ["mw1", 0, "mw1", 1]
+
+    result.clear()
+    m.append(mw2)
+    assert m._chains is None
+    await m(2, handler)
+
+    assert result == ["mw1", "mw2", 2]
+
+    m.compile()
+    assert m._chains == {}
+
+
+async def test_chain_per_handler():
+    result = []
+
+    async def handler1(message):
+        result.append(1)
+
+    async def handler2(message):
+        result.append(2)
+
+    async def mw(message, handler):
+        await handler(message)
+
+    m = Middlewares()
+    m.append(mw)
+    await m(0, handler1)
+    await m(0, handler2)
+    await m(0, handler1)
+
+    assert result == [1, 2, 1]
+    assert len(m._chains) == 2
+
+
+async def test_scoped(mocker):
+    result = []
+
+    def make_middleware(name):
+        async def middleware(message, handler):
+            result.append(name)
+            await handler(message)
+        return middleware
+
+    async def handler1(message):
+        result.append("handler1")
+
+    async def handler2(message):
+        result.append("handler2")
+
+    h1 = Handler(handler1, content_type=Content.COMMAND, rule=Command("/start"))
+    h2 = Handler(handler2, content_type=Content.TEXT)
+
+    m = Middlewares()
+    m.append(make_middleware("all"))
+    m.append(make_middleware("group"), chat_type=Chat.GROUP)
+    m.append(make_middleware("edited"), incoming=Incoming.EDITED_MESSAGE)
+    m.append(make_middleware("text"), content_type=Content.TEXT)
+    m.append(make_middleware("start"), rule=Command("/start"))
+    m.append(make_middleware("handler2"), handlers={handler2})
+
+    def message(chat_type, incoming, content_type):
+        return mocker.MagicMock(chat_type=chat_type, incoming=incoming, content_type=content_type)
+
+    await m(message(Chat.PRIVATE, Incoming.NEW_MESSAGE, Content.COMMAND), h1)
+    assert result == ["all", "start", "handler1"]
+
+    result.clear()
+    await m(message(Chat.GROUP, Incoming.EDITED_MESSAGE, Content.TEXT), h2)
+    assert result == ["all", "group", "edited", "text", "handler2", "handler2"]
+
+    result.clear()
+    await m(message(Chat.PRIVATE, Incoming.NEW_MESSAGE, Content.TEXT), h2)
+    assert result == ["all", "text", "handler2", "handler2"]
+
+    default = Handler()
+    result.clear()
+    await m(message(Chat.PRIVATE, Incoming.NEW_MESSAGE, Content.PHOTO), default)
+    assert result == ["all"]
+
+    assert len(m._chains) == 4
+    assert (id(h1), Chat.PRIVATE, Incoming.NEW_MESSAGE, Content.COMMAND) in m._chains
+
+
+@pytest.mark.parametrize("rule", [RegExp("^x"), Text("x"), Contains("x"), Command("/start")])
+async def test_rule_scope(mocker, rule):
+    result = []
+
+    async def middleware(message, handler):
+        result.append("middleware")
+        await handler(message)
+
+    async def handler(message):
+        result.append("handler")
+
+    m = Middlewares()
+    m.append(middleware, rule=rule)
+    message = mocker.MagicMock(chat_type=Chat.PRIVATE, incoming=Incoming.NEW_MESSAGE, content_type=Content.PHOTO)
+
+    await m(message, Handler(handler, content_type=Content.PHOTO))
+    await m(message, Handler())
+    await m(message, Handler(handler, content_type=Content.TEXT, rule="x"))
+    assert result == ["handler", "handler"]
+
+    await m(message, Handler(handler, content_type=Content.TEXT, rule=rule))
+    assert result == ["handler", "handler", "middleware", "handler"]
+
+
+async def test_rule_scope_prepared(mocker):
+    result = []
+
+    async def middleware(message, handler):
+        result.append("middleware")
+        await handler(message)
+
+    async def handler(message):
+        result.append("handler")
+
+    m = Middlewares()
+    m.append(middleware, content_type=Content.COMMAND, rule="/start")
+    message = mocker.MagicMock(chat_type=Chat.PRIVATE, incoming=Incoming.NEW_MESSAGE, content_type=Content.COMMAND)
+    await m(message, Handler(handler, content_type=Content.COMMAND, rule=Command("/start")))
+    assert result == ["middleware", "handler"]
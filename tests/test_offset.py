@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+
+from aiotelegrambot.offset import FileOffsetStore, OffsetStore, OffsetTracker, SQLiteOffsetStore
+
+
+class MemoryOffsetStore(OffsetStore):
+    def __init__(self, offset=0):
+        self.offset = offset
+        self.saved = []
+
+    def load(self):
+        return self.offset
+
+    def save(self, offset):
+        self.offset = offset
+        self.saved.append(offset)
+
+
+def test_offset_store():
+    store = OffsetStore()
+    with pytest.raises(NotImplementedError):
+        store.load()
+    with pytest.raises(NotImplementedError):
+        store.save(1)
+    store.close()
+
+
+def test_file_offset_store(tmp_path):
+    path = str(tmp_path / "offset")
+    store = FileOffsetStore(path)
+    assert store.load() == 0
+
+    store.save(10)
+    store.save(12)
+    assert FileOffsetStore(path).load() == 12
+    assert not (tmp_path / "offset.tmp").exists()
+    store.close()
+
+
+def test_sqlite_offset_store(tmp_path):
+    path = str(tmp_path / "offset.db")
+    store = SQLiteOffsetStore(path)
+    other = SQLiteOffsetStore(path, "other")
+    assert store.load() == 0
+
+    store.save(10)
+    store.save(12)
+    other.save(5)
+    store.close()
+    other.close()
+
+    store = SQLiteOffsetStore(path)
+    assert store.load() == 12
+    store.close()
+
+
+class TestOffsetTracker:
+    async def test_add(self):
+        tracker = OffsetTracker(MemoryOffsetStore(5))
+        assert tracker.offset == 5
+
+        assert tracker.add(5) is True
+        assert tracker.add(6) is True
+        assert tracker.add(6) is False
+        assert tracker.add(4) is False
+        assert tracker.offset == 5
+        assert tracker.pending == 2
+
+    async def test_done(self):
+        store = MemoryOffsetStore()
+        tracker = OffsetTracker(store, batch_size=2)
+        for update_id in (1, 2, 3):
+            tracker.add(update_id)
+        assert tracker.offset == 1
+
+        # the first update is still being handled
+        tracker.done(2)
+        assert tracker.offset == 1
+        tracker.done(100)
+        assert tracker.offset == 1
+        assert store.saved == []
+
+        tracker.done(1)
+        assert tracker.offset == 3
+        assert store.saved == [3]
+
+        tracker.done(3)
+        assert tracker.offset == 4
+        assert tracker.pending == 0
+        assert store.saved == [3]
+
+        tracker.add(10)
+        assert tracker.offset == 10
+
+        tracker.close()
+        assert store.saved == [3, 10]
+
+    async def test_wait(self):
+        tracker = OffsetTracker(MemoryOffsetStore())
+        tracker.add(1)
+
+        asyncio.get_event_loop().call_later(0.01, tracker.done, 1)
+        await asyncio.wait_for(tracker.wait(), 1)
+        assert tracker.offset == 2
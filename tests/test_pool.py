@@ -0,0 +1,28 @@
+import pytest
+
+from aiotelegrambot.pool import Pool
+
+
+def test___init__():
+    p = Pool()
+    assert (p.limit, p.limit_per_host, p.keepalive_timeout) == (100, 0, 30.0)
+    assert (p.ttl_dns_cache, p.use_dns_cache) == (300, True)
+
+    with pytest.raises(ValueError):
+        Pool(limit=-1)
+
+
+async def test_connector():
+    connector = Pool(limit=10, limit_per_host=5).connector()
+    try:
+        assert connector.limit == 10
+        assert connector.limit_per_host == 5
+        assert connector.use_dns_cache is True
+    finally:
+        await connector.close()
+
+
+def test___repr__():
+    assert str(Pool()) == (
+        "Pool(limit=100, limit_per_host=0, keepalive_timeout=30.0, ttl_dns_cache=300, use_dns_cache=True)"
+    )
@@ -0,0 +1,310 @@
+import re
+
+import pytest
+
+from aiotelegrambot import Content, Handler, Incoming
+from aiotelegrambot.routing import (
+    CommandTable, ContainsGroup, PrefixGroup, RegExpGroup, Route, TextTable, _Alternation, _Automaton, _Candidate,
+    _PrefixTrie
+)
+from aiotelegrambot.rules import Command, Contains, Prefix, RegExp, Text
+from aiotelegrambot.text import NormalizedText
+
+
+async def handler(message):
+    pass
+
+
+def make_handler(rule, content_type=Content.COMMAND):
+    return Handler(handler, content_type=content_type, rule=rule)
+
+
+class TestCandidate:
+    def test_match(self):
+        h = make_handler(None)
+        assert _Candidate(h).match(None) == (h, None)
+        assert _Candidate(h).match("text") == (h, None)
+
+        h = make_handler(Text("text"), Content.TEXT)
+        assert _Candidate(h).match("TEXT") == (h, None)
+        assert _Candidate(h).match("other") is None
+        assert _Candidate(h).match(None) is None
+
+    def test_match_regexp(self):
+        h = make_handler(RegExp(r"(\d+)"), Content.TEXT)
+
+        handler, match = _Candidate(h).match("42 apples")
+        assert handler is h
+        assert match.group(1) == "42"
+        assert _Candidate(h).match("apples") is None
+        assert _Candidate(h).match(None) is None
+
+
+class TestCommandTable:
+    def test_match(self):
+        h1 = make_handler(Command("/start"))
+        h2 = make_handler(Command("/help"))
+        h3 = make_handler(Command("/help"))
+        table = CommandTable([h1, h2, h3])
+
+        assert table.match("/start") == (h1, None)
+        assert table.match("/help") == (h2, None)
+        assert table.match("/HELP") is None
+        assert table.match("/stop") is None
+        assert table.match(None) is None
+
+    @pytest.mark.parametrize(
+        "username, value, expected",
+        [
+            (None, "/start@any_bot", False),
+            (None, "/start", True),
+            ("our_bot", "/start@our_bot", True),
+            ("Our_Bot", "/start@our_bot", True),
+            ("our_bot", "/start@OUR_BOT", True),
+            ("our_bot", "/start@other_bot", False),
+            ("our_bot", "/start", True),
+        ]
+    )
+    def test_match_username(self, username, value, expected):
+        h = make_handler(Command("/start"))
+        table = CommandTable([h], username)
+
+        assert (table.match(value) == (h, None)) is expected
+
+    def test_match_insensitive(self):
+        h1 = make_handler(Command("/Start", True))
+        h2 = make_handler(Command("/start"))
+        table = CommandTable([h1, h2])
+
+        assert table.match("/START") == (h1, None)
+        assert table.match("/start") == (h1, None)
+
+        table = CommandTable([h2, h1])
+        assert table.match("/start") == (h2, None)
+        assert table.match("/START") == (h1, None)
+
+
+class TestTextTable:
+    def test_match(self):
+        h1 = make_handler(Text("Hello", False), Content.TEXT)
+        h2 = make_handler(Text("hello"), Content.TEXT)
+        h3 = make_handler(Text("Grüße", casefold=True), Content.TEXT)
+        h4 = make_handler(Text("bye"), Content.TEXT)
+        table = TextTable([h1, h2, h3, h4])
+
+        assert table.match("Hello") == (h1, None)
+        assert table.match(NormalizedText("HELLO")) == (h2, None)
+        assert table.match("GRÜSSE") == (h3, None)
+        assert table.match("Bye") == (h4, None)
+        assert table.match("hello!") is None
+        assert table.match(None) is None
+
+
+class TestRegExpGroup:
+    def test_match(self):
+        h1 = make_handler(RegExp(r"(\d+) apples?"), Content.TEXT)
+        h2 = make_handler(RegExp(r"(\d+)"), Content.TEXT)
+        h3 = make_handler(RegExp(r"(?P<word>\w+)"), Content.TEXT)
+        group = RegExpGroup([h1, h2, h3])
+
+        assert len(group._steps) == 1
+        assert isinstance(group._steps[0], _Alternation)
+
+        handler, match = group.match("12 apples")
+        assert handler is h1
+        assert match.groups() == ("12",)
+
+        handler, match = group.match("12 pears")
+        assert handler is h2
+        assert match.groups() == ("12",)
+
+        handler, match = group.match("pears")
+        assert handler is h3
+        assert match.group("word") == "pears"
+
+        assert group.match("!") is None
+        assert group.match(None) is None
+        assert group.match(["list"]) is None
+
+    def test_match_same_group_names(self):
+        h1 = make_handler(RegExp(r"a(?P<x>\d)"), Content.TEXT)
+        h2 = make_handler(RegExp(r"b(?P<x>\d)"), Content.TEXT)
+        h3 = make_handler(RegExp(r"c(?P<y>\d)"), Content.TEXT)
+        group = RegExpGroup([h1, h2, h3])
+
+        assert [type(step) for step in group._steps] == [_Candidate, _Alternation]
+        assert group.match("a1")[1].group("x") == "1"
+        assert group.match("b2")[0] is h2
+        assert group.match("c3")[1].group("y") == "3"
+
+    @pytest.mark.parametrize(
+        "pattern, expected",
+        [
+            (r"\d+", True),
+            (r"(?i:hello)", True),
+            (r"(?P<x>a)(?P=x)", True),
+            (r"(?i)hello", False),
+            (re.compile("hello", re.IGNORECASE), False),
+            (r"(a)\1", False),
+            (r"(a)?(?(1)b|c)", False),
+            (re.compile(b"bytes"), False),
+        ]
+    )
+    def test_accepts(self, pattern, expected):
+        assert RegExpGroup.accepts(RegExp(pattern)) is expected
+
+
+class TestAutomaton:
+    @pytest.mark.parametrize(
+        "text, expected",
+        [
+            ("ushe", 1),
+            ("she", 1),
+            ("his", 3),
+            ("hers", 0),
+            ("he", 2),
+            ("ahishers", 0),
+            ("xyz", None),
+            ("", None),
+        ]
+    )
+    def test_search(self, text, expected):
+        automaton = _Automaton([("hers", 0), ("she", 1), ("he", 2), ("his", 3)])
+
+        assert automaton.search(text) == expected
+
+    def test_search_empty_keyword(self):
+        assert _Automaton([("abc", 0), ("", 1)]).search("xyz") == 1
+        assert _Automaton([("abc", 0), ("", 1)]).search("abc") == 0
+
+    def test_search_duplicate_keyword(self):
+        assert _Automaton([("abc", 1), ("abc", 2), ("b", 3)]).search("abc") == 1
+
+
+class TestContainsGroup:
+    @pytest.mark.parametrize("threshold", [1, 128])
+    def test_match(self, mocker, threshold):
+        mocker.patch.object(ContainsGroup, "AUTOMATON_THRESHOLD", threshold)
+        h1 = make_handler(Contains("Spam", False), Content.TEXT)
+        h2 = make_handler(Contains("buy"), Content.TEXT)
+        h3 = make_handler(Contains("am"), Content.TEXT)
+        group = ContainsGroup([h1, h2, h3])
+
+        assert (group._automatons is not None) is (threshold == 1)
+
+        assert group.match("no Spam, just BUY") == (h1, None)
+        assert group.match("no spam, just BUY") == (h2, None)
+        assert group.match("no spam") == (h3, None)
+        assert group.match("nothing") is None
+        assert group.match(None) is None
+
+    @pytest.mark.parametrize("threshold", [1, 128])
+    def test_match_casefold(self, mocker, threshold):
+        mocker.patch.object(ContainsGroup, "AUTOMATON_THRESHOLD", threshold)
+        h1 = make_handler(Contains("straße", casefold=True), Content.TEXT)
+        h2 = make_handler(Contains("die"), Content.TEXT)
+        group = ContainsGroup([h1, h2])
+
+        assert group._modes == [(True, True), (True, False)]
+        assert group.match("Die STRASSE") == (h1, None)
+        assert group.match("Die Strase") == (h2, None)
+
+    def test_match_sensitive(self, mocker):
+        mocker.patch.object(ContainsGroup, "AUTOMATON_THRESHOLD", 1)
+        h = make_handler(Contains("Spam", False), Content.TEXT)
+        group = ContainsGroup([h])
+
+        assert group._modes == [(False, False)]
+        assert group.match("Spam") == (h, None)
+        assert group.match("spam") is None
+
+
+class TestPrefixTrie:
+    @pytest.mark.parametrize(
+        "text, expected",
+        [
+            ("vote:up", 0),
+            ("vote:down", 1),
+            ("vote", 1),
+            ("page:2", 2),
+            ("pa", None),
+            ("", None),
+        ]
+    )
+    def test_search(self, text, expected):
+        trie = _PrefixTrie([("vote:up", 0), ("vo", 1), ("page:", 2), ("vote:", 3)])
+
+        assert trie.search(text) == expected
+
+    def test_search_empty_prefix(self):
+        assert _PrefixTrie([("a", 0), ("", 1)]).search("b") == 1
+        assert _PrefixTrie([("a", 0), ("", 1)]).search("a") == 0
+
+
+class TestPrefixGroup:
+    def test_match(self):
+        h1 = make_handler(Prefix("vote:"), None)
+        h2 = make_handler(Prefix("PAGE:", True), None)
+        h3 = make_handler(Prefix("v"), None)
+        group = PrefixGroup([h1, h2, h3])
+
+        assert group.match("vote:1") == (h1, None)
+        assert group.match("page:1") == (h2, None)
+        assert group.match("volume") == (h3, None)
+        assert group.match("Vote:1") is None
+        assert group.match(None) is None
+
+
+class TestRoute:
+    def test___init__(self):
+        handlers = [
+            make_handler(Command("/a")),
+            make_handler(Command("/b")),
+            make_handler(Text("a"), Content.TEXT),
+            make_handler(Command("/c")),
+            make_handler(None),
+        ]
+        route = Route(handlers, "bot")
+
+        assert route.handlers == tuple(handlers)
+        assert [type(step) for step in route._steps] == [CommandTable, TextTable, CommandTable, _Candidate]
+        assert route._steps[0]._username == "bot"
+
+    def test_match(self):
+        handlers = [make_handler(Command("/a")), make_handler(Command("/b")), make_handler(None)]
+        route = Route(handlers)
+
+        def raw(text):
+            return {"message": {"text": text, "entities": [{"offset": 0, "length": len(text.split()[0])}]}}
+
+        assert route.match(Incoming.NEW_MESSAGE, Content.COMMAND, raw("/b something")) == (handlers[1], None)
+        assert route.match(Incoming.NEW_MESSAGE, Content.COMMAND, raw("/a")) == (handlers[0], None)
+        assert route.match(Incoming.NEW_MESSAGE, Content.COMMAND, raw("/c")) == (handlers[2], None)
+
+    def test_match_regexp(self):
+        handlers = [
+            make_handler(RegExp(r"hi (\w+)"), Content.TEXT),
+            make_handler(RegExp(r"(\w)\1"), Content.TEXT),
+            make_handler(RegExp(r"bye (\w+)"), Content.TEXT),
+            make_handler(RegExp(r"see you (\w+)"), Content.TEXT),
+        ]
+        route = Route(handlers)
+
+        assert [type(step) for step in route._steps] == [RegExpGroup, _Candidate, RegExpGroup]
+
+        handler, match = route.match(Incoming.NEW_MESSAGE, Content.TEXT, {"message": {"text": "see you soon"}})
+        assert handler is handlers[3]
+        assert match.group(1) == "soon"
+
+        handler, match = route.match(Incoming.NEW_MESSAGE, Content.TEXT, {"message": {"text": "oops"}})
+        assert handler is handlers[1]
+        assert match.group(1) == "o"
+
+    def test_match_no_rules(self, mocker):
+        mock_get_value = mocker.patch("aiotelegrambot.routing.get_value")
+        h = make_handler(None)
+
+        assert Route([h]).match(Incoming.NEW_MESSAGE, Content.TEXT, {}) == (h, None)
+        assert mock_get_value.call_count == 0
+
+        assert Route([]).match(Incoming.NEW_MESSAGE, Content.TEXT, {}) is None
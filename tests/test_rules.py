@@ -1,7 +1,11 @@
 import pytest
 
+from aiotelegrambot.entities import Entities
 from aiotelegrambot.errors import RuleError
-from aiotelegrambot.rules import Command, Contains, Mention, RegExp, Text, is_match, prepare_rule
+from aiotelegrambot.rules import (
+    And, ChatId, Command, Contains, HasEntity, Mention, Not, Or, Prefix, RegExp, Rule, Text, get_value, is_match,
+    prepare_rule
+)
 from aiotelegrambot.types import Content, Incoming
 
 
@@ -56,6 +60,23 @@ class TestText:
         assert t._text == text
         assert t._insensitive is False
 
+    def test_properties(self):
+        t = Text("TEXT")
+
+        assert t.text == "text"
+        assert t.insensitive is True
+        assert t.casefold is False
+
+    def test_casefold(self):
+        t = Text("Straße", False, casefold=True)
+
+        assert t.text == "strasse"
+        assert t.insensitive is True
+        assert t == "STRASSE"
+        assert t != Text("strasse")
+        assert Text("Straße") != "STRASSE"
+        assert repr(t) == 'Text("strasse", casefold=True)'
+
     @pytest.mark.parametrize("isinstance_value", [True, False])
     @pytest.mark.parametrize("insensitive", [True, False])
     def test___eq__(self, mocker, isinstance_value, insensitive):
@@ -115,6 +136,26 @@ class TestContains:
         text = "TEXT"
         assert str(Contains(text)) == 'Contains("{}", True)'.format(text.lower())
 
+    def test_casefold(self):
+        c = Contains("straße", casefold=True)
+
+        assert c == "Die STRASSE"
+        assert Contains("straße") != "Die STRASSE"
+
+
+class TestPrefix:
+    def test___eq__(self):
+        p = Prefix("vote:")
+
+        assert p.insensitive is False
+        assert p == "vote:1"
+        assert p == "vote:"
+        assert p != "VOTE:1"
+        assert p != "a vote:1"
+        assert Prefix("vote:", True) == "VOTE:1"
+        assert p == Prefix("vote:")
+        assert p != Text("vote:", False)
+
 
 class TestCommand:
     def test_pattern(self):
@@ -162,6 +203,15 @@ def test_prepare_rule(params):
     assert isinstance(prepare_rule(content_type, rule), cls)
 
 
+def test_prepare_rule_incoming():
+    rule = prepare_rule(None, "Vote", Incoming.CALLBACK_QUERY)
+    assert rule == Text("Vote", False)
+
+    assert prepare_rule(None, "Vote", Incoming.MY_CHAT_MEMBER) == "Vote"
+    prefix = Prefix("vote:")
+    assert prepare_rule(None, prefix, Incoming.CALLBACK_QUERY) is prefix
+
+
 @pytest.mark.parametrize(
     "data",
     [
@@ -217,3 +267,176 @@ def test_is_match_is_not_message_or_post(mocker):
     incoming = mocker.MagicMock()
     incoming.is_message_or_post = False
     assert is_match(mocker.MagicMock(), incoming, mocker.MagicMock(), mocker.MagicMock()) is False
+
+
+def test_get_value():
+    raw = {Incoming.NEW_MESSAGE.value: {"text": "text"}}
+
+    assert get_value(Incoming.NEW_MESSAGE, Content.TEXT, raw) == "text"
+    assert get_value(Incoming.NEW_MESSAGE, None, raw) is None
+    assert get_value(None, None, raw) is None
+    assert is_match("text", Incoming.NEW_MESSAGE, None, raw) is False
+
+
+@pytest.mark.parametrize(
+    "incoming, raw, expected",
+    [
+        (Incoming.CALLBACK_QUERY, {"id": "1", "data": "vote:1"}, "vote:1"),
+        (Incoming.CALLBACK_QUERY, {"id": "1", "game_short_name": "game"}, None),
+        (Incoming.INLINE_QUERY, {"id": "1", "query": "cats"}, "cats"),
+        (Incoming.MY_CHAT_MEMBER, {"chat": {"id": 1}}, None),
+    ]
+)
+def test_get_value_incoming(incoming, raw, expected):
+    assert get_value(incoming, None, {incoming.value: raw}) == expected
+
+
+def test_get_value_entity():
+    raw = {
+        Incoming.NEW_MESSAGE.value: {
+            "text": "@😀_bot hello",
+            "entities": [{"type": "mention", "offset": 0, "length": 7}],
+        }
+    }
+
+    assert get_value(Incoming.NEW_MESSAGE, Content.MENTION, raw) == "@😀_bot"
+
+
+class TestChatId:
+    def test_check(self):
+        rule = ChatId(1, 2)
+        raw = {"message": {"chat": {"id": 2}}}
+
+        assert rule.check(None, Incoming.NEW_MESSAGE, raw) is True
+        assert rule.check(None, Incoming.NEW_MESSAGE, {"message": {"chat": {"id": 3}}}) is False
+        assert rule.check(None, Incoming.INLINE_QUERY, {"inline_query": {"query": ""}}) is False
+        assert rule.check("text") is False
+        assert rule != "text"
+        assert rule == ChatId(2, 1)
+        assert repr(rule) == "ChatId(1, 2)"
+
+
+class TestHasEntity:
+    def test_check(self):
+        raw = {
+            "message": {
+                "chat": {"id": 1},
+                "text": "😀 #News and #more",
+                "entities": [
+                    {"type": "hashtag", "offset": 3, "length": 5},
+                    {"type": "hashtag", "offset": 13, "length": 5},
+                ],
+                "caption": "see example.com",
+                "caption_entities": [{"type": "url", "offset": 4, "length": 11}],
+            }
+        }
+
+        assert HasEntity(Content.HASHTAG).check(None, Incoming.NEW_MESSAGE, raw) is True
+        assert HasEntity(Content.HASHTAG, "#news").check(None, Incoming.NEW_MESSAGE, raw) is True
+        assert HasEntity(Content.HASHTAG, "#other", "#more").check(None, Incoming.NEW_MESSAGE, raw) is True
+        assert HasEntity(Content.HASHTAG, "#news", insensitive=False).check(None, Incoming.NEW_MESSAGE, raw) is False
+        assert HasEntity("url", "example.com").check(None, Incoming.NEW_MESSAGE, raw) is True
+        assert HasEntity(Content.MENTION).check(None, Incoming.NEW_MESSAGE, raw) is False
+        assert HasEntity(Content.HASHTAG).check(None, Incoming.CALLBACK_QUERY, {"callback_query": {}}) is False
+        assert HasEntity(Content.HASHTAG).check("#news") is False
+
+    def test_shared_entities(self, mocker):
+        raw = {"message": {"text": "#a", "entities": [{"type": "hashtag", "offset": 0, "length": 2}]}}
+        mock_init = mocker.spy(Entities, "__init__")
+
+        assert HasEntity(Content.HASHTAG, "#a").check(None, Incoming.NEW_MESSAGE, raw) is True
+        assert HasEntity(Content.HASHTAG, "#b").check(None, Incoming.NEW_MESSAGE, raw) is False
+        assert mock_init.call_count == 1
+
+    def test_error(self):
+        with pytest.raises(RuleError):
+            HasEntity(Content.TEXT)
+
+    def test___eq__(self):
+        rule = HasEntity(Content.HASHTAG, "#B", "#a")
+
+        assert rule == HasEntity("hashtag", "#a", "#b")
+        assert rule != HasEntity("hashtag", "#a")
+        assert rule != "#a"
+        assert repr(rule) == 'HasEntity("hashtag", "#a", "#b")'
+
+
+class TestComposite:
+    def test_cost_order(self):
+        regexp = RegExp(r"\d+")
+        contains = Contains("a")
+        chat_id = ChatId(1)
+        rule = And(regexp, contains, chat_id)
+
+        assert rule.rules == (chat_id, contains, regexp)
+        assert rule.cost == regexp.cost + contains.cost + chat_id.cost
+
+    def test_flatten(self):
+        a, b, c = Text("a"), Text("b"), Text("c")
+
+        assert (a & b & c).rules == (a, b, c)
+        assert (a | b | c).rules == (a, b, c)
+        assert And(a | b, c).rules == (c, Or(a, b))
+        assert Not(Not(a)).rules == (Not(a),)
+
+    def test_empty(self):
+        with pytest.raises(RuleError):
+            And()
+
+    def test_short_circuit(self, mocker):
+        cheap = mocker.MagicMock(spec=Rule, cost=0, priority=None)
+        cheap.check.return_value = False
+        expensive = mocker.MagicMock(spec=Rule, cost=100, priority=None)
+
+        assert And(expensive, cheap).check("text") is False
+        assert expensive.check.call_count == 0
+
+        cheap.check.return_value = True
+        assert Or(expensive, cheap).check("text") is True
+        assert expensive.check.call_count == 0
+
+    @pytest.mark.parametrize(
+        "rule, value, expected",
+        [
+            (Text("a") & Contains("a"), "a", True),
+            (Text("a") & Contains("b"), "a", False),
+            (Text("a") | Text("b"), "b", True),
+            (Text("a") | Text("b"), "c", False),
+            (~Text("a"), "b", True),
+            (~Text("a"), "a", False),
+            (~RegExp(r"\d") & Contains("x"), "xyz", True),
+            (~RegExp(r"\d") & Contains("x"), "1x", False),
+        ]
+    )
+    def test_check(self, rule, value, expected):
+        assert rule.check(value) is expected
+        assert (rule == value) is expected
+
+    def test_check_update(self):
+        rule = Command("/start") & ChatId(1)
+        raw = {"message": {"chat": {"id": 1}}}
+
+        assert rule.check("/start", Incoming.NEW_MESSAGE, raw) is True
+        assert rule.check("/stop", Incoming.NEW_MESSAGE, raw) is False
+        assert rule.check("/start", Incoming.NEW_MESSAGE, {"message": {"chat": {"id": 2}}}) is False
+
+    def test_priority(self):
+        assert (Command("/start") & Contains("a")).priority == Command.priority
+        assert (Command("/start") | Contains("a")).priority == Contains.priority
+        assert (Text("a") & ChatId(1)).priority == Text.priority
+        assert (~Command("/start")).priority == Not.priority
+        assert Or("a", "b").priority == Text.priority
+        assert And(RegExp("a"), 1).priority == Text.priority
+        assert Or(Rule()).priority is None
+
+    def test___eq__(self):
+        assert Text("a") & Text("b") == Text("b") & Text("a")
+        assert Text("a") & Text("b") != Text("a") | Text("b")
+        assert repr(Text("a") & ~Text("b")) == 'And(Text("a", True), Not(Text("b", True)))'
+
+
+def test_prepare_rule_composite():
+    rule = prepare_rule(Content.COMMAND, Or("/start", "/help"))
+
+    assert rule == Or(Command("/start"), Command("/help"))
+    assert isinstance(prepare_rule(Content.TEXT, Not(1)).rules[0], Text)
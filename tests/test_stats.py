@@ -0,0 +1,69 @@
+import asyncio
+
+import aiohttp
+from aiohttp import web
+
+from aiotelegrambot.stats import PollingStats, PoolStats
+
+
+def test_polling_stats():
+    stats = PollingStats()
+    assert stats.average_round_trip_time == 0.0
+
+    stats.poll(0.2, 3)
+    stats.poll(0.4, 0)
+    stats.idle(0.1)
+    stats.throttle(0.5)
+
+    assert stats.polls == 2
+    assert stats.empty_polls == 1
+    assert stats.updates == 3
+    assert stats.last_round_trip_time == 0.4
+    assert abs(stats.average_round_trip_time - 0.3) < 1e-9
+    assert stats.idle_time == 0.1
+    assert stats.throttles == 1
+    assert stats.throttled_time == 0.5
+
+
+async def test_pool_stats(aiohttp_server):
+    stats = PoolStats()
+    assert (stats.limit, stats.acquired, stats.idle, stats.waiting) == (0, 0, 0, 0)
+    assert stats.available is None
+
+    finished = asyncio.Event()
+
+    async def handler(request):
+        # the connection stays acquired until the body is read to the end
+        response = web.StreamResponse()
+        await response.prepare(request)
+        await response.write(b"o")
+        await finished.wait()
+        await response.write_eof(b"k")
+        return response
+
+    app = web.Application()
+    app.router.add_get("/", handler)
+    server = await aiohttp_server(app)
+
+    connector = aiohttp.TCPConnector(limit=10)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        response = await session.get(server.make_url("/"))
+        stats = PoolStats(connector)
+        assert (stats.limit, stats.acquired, stats.idle, stats.waiting) == (10, 1, 0, 0)
+        assert stats.available == 9
+
+        finished.set()
+        assert await response.read() == b"ok"
+        stats = PoolStats(connector)
+        assert (stats.acquired, stats.idle) == (0, 1)
+        assert str(stats) == "PoolStats(limit=10, acquired=0, idle=1, waiting=0)"
+
+    assert PoolStats(connector).limit == 0
+
+
+def test_pool_stats_no_internals(mocker):
+    connector = mocker.MagicMock(spec=["limit", "limit_per_host", "closed"], limit=5, limit_per_host=0, closed=False)
+    stats = PoolStats(connector)
+
+    assert (stats.limit, stats.acquired, stats.idle, stats.waiting) == (5, 0, 0, 0)
+    assert stats.available == 5
@@ -0,0 +1,31 @@
+import pytest
+
+from aiotelegrambot.text import NormalizedText, normalize
+
+
+def test_normalized_text(mocker):
+    text = NormalizedText(" Straße ")
+
+    assert text == " Straße "
+    assert isinstance(text, str)
+    assert text.lowered == " straße "
+    assert text.casefolded == " strasse "
+    assert text.stripped == "Straße"
+
+    mock_lower = mocker.patch.object(NormalizedText, "lower")
+    text.lowered
+    assert mock_lower.call_count == 0
+
+
+@pytest.mark.parametrize("cls", [str, NormalizedText])
+@pytest.mark.parametrize(
+    "insensitive, casefold, expected",
+    [
+        (False, False, "Straße"),
+        (True, False, "straße"),
+        (False, True, "strasse"),
+        (True, True, "strasse"),
+    ]
+)
+def test_normalize(cls, insensitive, casefold, expected):
+    assert normalize(cls("Straße"), insensitive, casefold) == expected
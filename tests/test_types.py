@@ -1,7 +1,7 @@
 import pytest
 
 from aiotelegrambot import Chat, Content, Incoming
-from aiotelegrambot.types import recognize_incoming, recognize_type
+from aiotelegrambot.types import recognize_incoming, recognize_type, recognize_types
 
 
 def test_is_message_or_post():
@@ -9,6 +9,7 @@ def test_is_message_or_post():
     assert Incoming.EDITED_MESSAGE.is_message_or_post is True
     assert Incoming.CHANNEL_POST.is_message_or_post is True
     assert Incoming.EDITED_CHANNEL_POST.is_message_or_post is True
+    assert Incoming.CALLBACK_QUERY.is_message_or_post is False
 
 
 def test_has_entity():
@@ -89,13 +90,62 @@ def test_recognize_type(data):
     assert recognize_type(data) == (chat_type, incoming, content_type)
 
 
+@pytest.mark.parametrize(
+    "message, content_type",
+    [
+        ({"text": "hi /start", "entities": [{"offset": 3, "type": "bot_command"}]}, Content.TEXT),
+        ({"text": "hi", "entities": [{"offset": 0, "type": "bold"}]}, Content.TEXT),
+        ({"text": "#tag", "entities": [{"offset": 0, "type": "hashtag"}]}, Content.HASHTAG),
+        ({"caption": "/start", "caption_entities": [{"offset": 0, "type": "bot_command"}], "photo": []}, Content.PHOTO),
+        # the content types go in the order of the enum
+        ({"sticker": {}, "animation": {}, "document": {}}, Content.ANIMATION),
+        ({"new_chat_members": [], "new_chat_photo": []}, Content.NEW_CHAT_PHOTO),
+    ]
+)
+def test_recognize_type_content(message, content_type):
+    message["chat"] = {"type": Chat.GROUP.value}
+    assert recognize_type({"update_id": 1, "message": message}) == (Chat.GROUP, Incoming.NEW_MESSAGE, content_type)
+
+
+def test_recognize_type_unknown_chat():
+    with pytest.raises(ValueError):
+        recognize_type({"message": {"chat": {"type": "unknown"}}})
+
+
+def test_recognize_types():
+    updates = [
+        {"update_id": 1, "message": {"text": "text", "chat": {"type": Chat.PRIVATE.value}}},
+        {"update_id": 2, "edited_channel_post": {"video": {}, "chat": {"type": Chat.CHANNEL.value}}},
+        {"update_id": 3, "unknown": {}},
+    ]
+
+    assert recognize_types(updates) == [
+        (Chat.PRIVATE, Incoming.NEW_MESSAGE, Content.TEXT),
+        (Chat.CHANNEL, Incoming.EDITED_CHANNEL_POST, Content.VIDEO),
+        (None, None, None),
+    ]
+
+
 def test_recognize_type_none(mocker):
     mocker.patch("aiotelegrambot.types.recognize_incoming", return_value=None)
     assert recognize_type(mocker.MagicMock()) == (None, None, None)
 
 
-def test_recognize_type_incoming(mocker):
-    incoming = mocker.MagicMock()
-    incoming.is_message_or_post = False
-    mocker.patch("aiotelegrambot.types.recognize_incoming", return_value=incoming)
-    assert recognize_type(mocker.MagicMock()) == (None, incoming, None)
+@pytest.mark.parametrize(
+    "data, chat_type",
+    [
+        ({"inline_query": {"id": "1", "query": "q"}}, None),
+        ({"callback_query": {"id": "1", "data": "d"}}, None),
+        ({"callback_query": {"id": "1", "data": "d", "message": {"chat": {"type": "group"}}}}, Chat.GROUP),
+        ({"my_chat_member": {"chat": {"type": "channel"}}}, Chat.CHANNEL),
+    ]
+)
+def test_recognize_type_incoming(data, chat_type):
+    assert recognize_type(data) == (chat_type, Incoming(next(iter(data))), None)
+
+
+def test_value_key():
+    assert Incoming.CALLBACK_QUERY.value_key == "data"
+    assert Incoming.INLINE_QUERY.value_key == "query"
+    assert Incoming.MY_CHAT_MEMBER.value_key is None
+    assert Incoming.NEW_MESSAGE.value_key is None
@@ -0,0 +1,135 @@
+import asyncio
+import json
+
+import pytest
+
+from aiotelegrambot.webhook import SECRET_TOKEN_HEADER, WebhookHandler, create_app
+
+
+@pytest.fixture
+def bot(mocker):
+    bot = mocker.MagicMock()
+    bot.client.json_loads = json.loads
+    bot.client.dump_json = lambda data: json.dumps(data).encode()
+    bot.feed_update.return_value = True
+    return bot
+
+
+async def test_handler(aiohttp_client, bot):
+    client = await aiohttp_client(create_app(bot, "/hook"))
+
+    response = await client.post("/hook", data=b'{"update_id": 1}')
+
+    assert response.status == 200
+    bot.feed_update.assert_called_once_with({"update_id": 1}, None)
+
+
+async def test_handler_secret_token(aiohttp_client, bot):
+    client = await aiohttp_client(create_app(bot, secret_token="secret"))
+
+    response = await client.post("/", data=b'{"update_id": 1}')
+    assert response.status == 403
+
+    response = await client.post("/", data=b'{"update_id": 1}', headers={SECRET_TOKEN_HEADER: "wrong"})
+    assert response.status == 403
+    assert bot.feed_update.call_count == 0
+
+    response = await client.post("/", data=b'{"update_id": 1}', headers={SECRET_TOKEN_HEADER: "secret"})
+    assert response.status == 200
+    bot.feed_update.assert_called_once_with({"update_id": 1}, None)
+
+
+async def test_handler_invalid_body(aiohttp_client, bot):
+    client = await aiohttp_client(create_app(bot))
+
+    response = await client.post("/", data=b"not json")
+
+    assert response.status == 400
+    assert bot.feed_update.call_count == 0
+
+
+async def test_handler_buffer_is_full(aiohttp_client, bot):
+    bot.feed_update.return_value = False
+    client = await aiohttp_client(create_app(bot))
+
+    response = await client.post("/", data=b'{"update_id": 1}')
+
+    assert response.status == 503
+
+
+async def test_handler_max_connections(mocker, bot):
+    handler = WebhookHandler(bot, max_connections=1)
+    handler._connections = 1
+
+    response = await handler(mocker.MagicMock())
+
+    assert response.status == 503
+    assert bot.feed_update.call_count == 0
+
+
+async def test_handler_reply(aiohttp_client, bot):
+    def feed_update(data, webhook_reply):
+        asyncio.get_event_loop().call_soon(webhook_reply.set_result, {"method": "sendMessage", "text": "hi"})
+        return True
+
+    bot.feed_update.side_effect = feed_update
+    client = await aiohttp_client(create_app(bot, reply_timeout=1))
+
+    response = await client.post("/", data=b'{"update_id": 1}')
+
+    assert response.status == 200
+    assert await response.json() == {"method": "sendMessage", "text": "hi"}
+
+
+async def test_handler_reply_none(aiohttp_client, bot):
+    def feed_update(data, webhook_reply):
+        asyncio.get_event_loop().call_soon(webhook_reply.set_result, None)
+        return True
+
+    bot.feed_update.side_effect = feed_update
+    client = await aiohttp_client(create_app(bot, reply_timeout=1))
+
+    response = await client.post("/", data=b'{"update_id": 1}')
+
+    assert response.status == 200
+    assert await response.read() == b""
+
+
+async def test_handler_reply_timeout(aiohttp_client, bot):
+    replies = []
+
+    def feed_update(data, webhook_reply):
+        replies.append(webhook_reply)
+        return True
+
+    bot.feed_update.side_effect = feed_update
+    client = await aiohttp_client(create_app(bot, reply_timeout=0.01))
+
+    response = await client.post("/", data=b'{"update_id": 1}')
+
+    assert response.status == 200
+    assert await response.read() == b""
+    assert replies[0].cancelled()
+
+
+async def test_handler_reply_after_timeout(mocker, aiohttp_client, bot):
+    async def wait_for(awaitable, timeout):
+        # the handler replies after the deadline, before the reply is cancelled
+        awaitable.cancel()
+        replies[0].set_result({"method": "sendMessage", "text": "hi"})
+        raise asyncio.TimeoutError()
+
+    replies = []
+
+    def feed_update(data, webhook_reply):
+        replies.append(webhook_reply)
+        return True
+
+    bot.feed_update.side_effect = feed_update
+    client = await aiohttp_client(create_app(bot, reply_timeout=0.01))
+    mocker.patch("aiotelegrambot.webhook.asyncio.wait_for", new=wait_for)
+
+    response = await client.post("/", data=b'{"update_id": 1}')
+
+    assert response.status == 200
+    assert await response.json() == {"method": "sendMessage", "text": "hi"}